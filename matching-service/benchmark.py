@@ -6,8 +6,9 @@ data sizes and profiles.
 """
 
 import time
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict
+from services import kernels
 from services.compatibility_calculator import CompatibilityCalculator
 
 
@@ -68,6 +69,32 @@ def benchmark_v1(profiles: List[Dict], iterations: int = 100):
     return elapsed / total_calculations
 
 
+def benchmark_v1_batch(profiles: List[Dict], iterations: int = 100):
+    """Benchmark the batch V1 algorithm (compiled kernel when numba is installed)."""
+    print(f"\nBenchmarking batch V1 with {len(profiles)} profiles...")
+    
+    kernels.warm_up()
+    start_time = time.time()
+    
+    for _ in range(iterations):
+        CompatibilityCalculator.calculate_compatibility_v1_batch(
+            user_profile=profiles[0],
+            profiles=profiles[1:],
+        )
+    
+    end_time = time.time()
+    total_calculations = iterations * (len(profiles) - 1)
+    elapsed = end_time - start_time
+    
+    print(f"Batch V1 Results (numba: {kernels.NUMBA_AVAILABLE}):")
+    print(f"  Total calculations: {total_calculations}")
+    print(f"  Total time: {elapsed:.2f}s")
+    print(f"  Average time per calculation: {(elapsed / total_calculations) * 1000:.2f}ms")
+    print(f"  Calculations per second: {total_calculations / elapsed:.2f}")
+    
+    return elapsed / total_calculations
+
+
 def benchmark_v2(profiles: List[Dict], iterations: int = 100):
     """Benchmark V2 algorithm."""
     print(f"\nBenchmarking V2 with {len(profiles)} profiles...")
@@ -105,6 +132,7 @@ def run_benchmarks():
         (5, 100, "Small dataset"),
         (20, 50, "Medium dataset"),
         (50, 20, "Large dataset"),
+        (1000, 5, "Daily selection sized dataset"),
     ]
     
     for num_profiles, iterations, description in test_cases:
@@ -120,6 +148,10 @@ def run_benchmarks():
         # Benchmark V1
         v1_time = benchmark_v1(profiles, iterations)
         
+        # Benchmark batch V1
+        v1_batch_time = benchmark_v1_batch(profiles, iterations)
+        print(f"\nBatch V1 is {v1_time/v1_batch_time:.2f}x faster than pairwise V1")
+        
         # Benchmark V2
         v2_time = benchmark_v2(profiles, iterations)
         
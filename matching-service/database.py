@@ -7,7 +7,6 @@ to fetch user profiles for matching calculations.
 
 import os
 import logging
-from typing import Optional
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
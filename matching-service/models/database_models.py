@@ -102,7 +102,7 @@ class PersonalityAnswer(Base):
     __tablename__ = "personality_answers"
     
     id = Column(UUID(as_uuid=True), primary_key=True)
-    userId = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    userId = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
     questionId = Column(UUID(as_uuid=True), nullable=False)
     
     # Answer types (only one should be filled)
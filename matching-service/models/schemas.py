@@ -2,34 +2,51 @@
 Pydantic models for request and response schemas.
 """
 
-from datetime import datetime
-from typing import Any, Dict, List, Optional
-from pydantic import BaseModel, Field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from typing_extensions import NotRequired, TypedDict
 
+# Request models are read-only once validated; unknown fields sent by callers
+# are ignored rather than rejected
+REQUEST_MODEL_CONFIG = ConfigDict(frozen=True, extra="ignore")
 
-class PersonalityAnswer(BaseModel):
-    """Personality question answer model."""
+
+class PersonalityAnswer(TypedDict):
+    """
+    Personality question answer.
+
+    Validated into a plain dict rather than a model instance: answers are
+    by far the most numerous objects in batch requests, and the calculator
+    consumes them as dicts. Omitted fields stay omitted; the calculator
+    reads them as None, and a missing category as "personality".
+    """
 
     questionId: str
-    category: Optional[str] = "personality"
-    numericAnswer: Optional[int] = None
-    booleanAnswer: Optional[bool] = None
-    multipleChoiceAnswer: Optional[List[str]] = None
-    textAnswer: Optional[str] = None
+    category: NotRequired[Optional[str]]
+    numericAnswer: NotRequired[Optional[int]]
+    booleanAnswer: NotRequired[Optional[bool]]
+    multipleChoiceAnswer: NotRequired[Optional[List[str]]]
+    textAnswer: NotRequired[Optional[str]]
 
 
 class UserPreferences(BaseModel):
     """User preferences model."""
 
+    model_config = REQUEST_MODEL_CONFIG
+
     minAge: Optional[int] = 18
     maxAge: Optional[int] = 100
     gender: Optional[str] = None
+    interestedInGenders: Optional[List[str]] = None
     maxDistance: Optional[float] = None
 
 
 class UserProfile(BaseModel):
     """User profile model for compatibility calculation."""
 
+    model_config = REQUEST_MODEL_CONFIG
+
     userId: str
     age: Optional[int] = None
     gender: Optional[str] = None
@@ -52,10 +69,20 @@ class UserProfile(BaseModel):
     messagesReceived: int = 0
     matchesCount: int = 0
 
+    @field_validator("lastActiveAt", "lastLoginAt", "createdAt")
+    @classmethod
+    def assume_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        """Treat timestamps sent without a timezone as UTC."""
+        if value is not None and value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value
+
 
 class CompatibilityRequest(BaseModel):
     """Request model for calculate-compatibility endpoint."""
 
+    model_config = REQUEST_MODEL_CONFIG
+
     user1Profile: UserProfile
     user2Profile: UserProfile
 
@@ -63,6 +90,8 @@ class CompatibilityRequest(BaseModel):
 class CompatibilityRequestV2(BaseModel):
     """Request model for calculate-compatibility-v2 endpoint."""
 
+    model_config = REQUEST_MODEL_CONFIG
+
     user1Profile: UserProfile
     user2Profile: UserProfile
 
@@ -123,6 +152,8 @@ class CompatibilityResultV2(BaseModel):
 class BatchCompatibilityRequest(BaseModel):
     """Request model for batch-compatibility endpoint."""
 
+    model_config = REQUEST_MODEL_CONFIG
+
     baseProfile: UserProfile
     profilesToCompare: List[UserProfile]
 
@@ -133,9 +164,17 @@ class BatchCompatibilityResult(BaseModel):
     results: Dict[str, CompatibilityResult]
 
 
+class BatchCompatibilityResultV2(BaseModel):
+    """Response model for batch-compatibility-v2 endpoint."""
+
+    results: Dict[str, CompatibilityResultV2]
+
+
 class DailySelectionRequest(BaseModel):
     """Request model for generate-daily-selection endpoint."""
 
+    model_config = REQUEST_MODEL_CONFIG
+
     userId: str
     userProfile: UserProfile
     availableProfiles: List[UserProfile]
@@ -155,6 +194,7 @@ class AlgorithmStats(BaseModel):
     totalCalculations: int
     averageScore: float
     lastUpdate: str
+    localCacheHitRate: float = 0.0
     status: str = "online"
     version: str = "v2"
 
@@ -205,6 +245,8 @@ class SelectionProfile(BaseModel):
 class GenerateSelectionRequest(BaseModel):
     """Request model for generate-selection endpoint (V1 spec)."""
     
+    model_config = REQUEST_MODEL_CONFIG
+    
     userId: str
     count: int = Field(ge=3, le=5, default=5, description="Number of profiles to return (3-5)")
     excludeUserIds: List[str] = Field(default_factory=list, description="User IDs to exclude")
@@ -220,6 +262,8 @@ class GenerateSelectionResponse(BaseModel):
 class CalculateCompatibilityRequestV1(BaseModel):
     """Request model for calculate-compatibility endpoint (V1 spec)."""
     
+    model_config = REQUEST_MODEL_CONFIG
+    
     userId1: str
     userId2: str
 
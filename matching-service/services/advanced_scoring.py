@@ -7,9 +7,61 @@ This module implements advanced scoring factors:
 - Potential reciprocity scoring
 """
 
-from datetime import datetime, timedelta
+import math
+from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Dict, Optional
 
+import numpy as np
+
+from .kernels import advanced_factors
+
+# Factor scores of users without activity data or matches yet
+NO_ACTIVITY_SCORE = 0.5
+NO_MATCHES_RESPONSE_RATE_SCORE = 0.7
+
+
+@lru_cache(maxsize=8192)
+def _response_rate_score(messages_sent: int, messages_received: int, matches_count: int) -> float:
+    """Response rate score of message counts, memoized by calculate_response_rate_score."""
+    # No matches yet - return neutral score
+    if matches_count == 0:
+        return NO_MATCHES_RESPONSE_RATE_SCORE  # Give benefit of doubt to new users
+    
+    # No messages exchanged - low score
+    if messages_sent == 0 and messages_received == 0:
+        return 0.3
+    
+    # Calculate response ratio
+    # Ideal ratio is close to 1.0 (balanced conversation)
+    if messages_received == 0:
+        # User sends messages but gets no replies - moderate score
+        return 0.5
+    
+    if messages_sent == 0:
+        # User receives but doesn't respond - low score
+        return 0.2
+    
+    # Calculate ratio (balanced around 1.0)
+    ratio = messages_sent / messages_received
+    
+    # Optimal range: 0.7 to 1.5 (slightly favoring responsive users)
+    if 0.7 <= ratio <= 1.5:
+        score = 1.0
+    elif ratio < 0.7:
+        # Not responsive enough
+        score = max(0.2, ratio / 0.7)
+    else:
+        # Too eager (potential spam/desperate behavior)
+        score = max(0.5, 1.0 - (ratio - 1.5) * 0.2)
+    
+    # Adjust based on absolute activity level
+    # Users with higher absolute message counts get slight bonus
+    message_activity = min(messages_sent + messages_received, 100) / 100
+    activity_bonus = message_activity * 0.1
+    
+    return min(1.0, score + activity_bonus)
+
 
 class AdvancedScoringService:
     """Service for calculating advanced scoring factors in the matching algorithm."""
@@ -23,7 +75,8 @@ class AdvancedScoringService:
     def calculate_activity_score(
         last_active_at: Optional[datetime],
         last_login_at: Optional[datetime],
-        account_created_at: datetime,
+        account_created_at: Optional[datetime],
+        now: Optional[datetime] = None,
     ) -> float:
         """
         Calculate user activity score based on recent activity.
@@ -32,33 +85,18 @@ class AdvancedScoringService:
             last_active_at: When the user was last active
             last_login_at: When the user last logged in
             account_created_at: When the account was created
+            now: Current time (timezone-aware), read from the clock if not provided
             
         Returns:
             Activity score between 0.0 and 1.0
         """
-        from datetime import timezone
-        
-        now = datetime.now(timezone.utc)
-        
-        # Ensure all datetimes are timezone-aware
-        if last_active_at and last_active_at.tzinfo is None:
-            last_active_at = last_active_at.replace(tzinfo=timezone.utc)
-        if last_login_at and last_login_at.tzinfo is None:
-            last_login_at = last_login_at.replace(tzinfo=timezone.utc)
-        if account_created_at and account_created_at.tzinfo is None:
-            account_created_at = account_created_at.replace(tzinfo=timezone.utc)
+        hours_since_activity = AdvancedScoringService.hours_since_activity(
+            last_active_at, last_login_at, now or datetime.now(timezone.utc)
+        )
         
         # If no activity data, return neutral score
-        if not last_active_at and not last_login_at:
-            return 0.5
-        
-        # Use the most recent activity indicator
-        most_recent = last_active_at or last_login_at
-        if last_login_at and last_active_at:
-            most_recent = max(last_active_at, last_login_at)
-        
-        # Calculate hours since last activity
-        hours_since_activity = (now - most_recent).total_seconds() / 3600
+        if hours_since_activity is None:
+            return NO_ACTIVITY_SCORE
         
         # Score based on recency (exponential decay)
         # Active within 24h: 0.9-1.0
@@ -79,6 +117,108 @@ class AdvancedScoringService:
             # Very inactive users get minimal score
             return max(0.0, 0.3 - ((hours_since_activity - 720) / 720) * 0.3)
 
+    @staticmethod
+    def calculate_activity_scores(hours_since_activity: np.ndarray) -> np.ndarray:
+        """
+        Calculate activity scores of many users at once.
+        
+        Applies the same decay, with the same operations, as
+        calculate_activity_score, so scores are identical.
+        
+        Args:
+            hours_since_activity: Hours since each user's last activity,
+                NaN for users without activity data
+            
+        Returns:
+            Activity scores between 0.0 and 1.0
+        """
+        hours = np.asarray(hours_since_activity, dtype=float)
+        return np.select(
+            [np.isnan(hours), hours <= 24, hours <= 72, hours <= 168, hours <= 720],
+            [
+                0.5,
+                1.0 - (hours / 24) * 0.1,
+                0.9 - ((hours - 24) / 48) * 0.2,
+                0.7 - ((hours - 72) / 96) * 0.2,
+                0.5 - ((hours - 168) / 552) * 0.2,
+            ],
+            np.maximum(0.0, 0.3 - ((hours - 720) / 720) * 0.3),
+        )
+
+    @staticmethod
+    def epoch_seconds(value: Optional[datetime]) -> float:
+        """
+        Convert a timestamp to seconds since the epoch.
+        
+        Activity is measured on these floats rather than on datetimes, so
+        the batch path can do the arithmetic on arrays.
+        
+        Args:
+            value: Timestamp, naive ones are taken as UTC
+            
+        Returns:
+            Seconds since the epoch, NaN if value is missing
+        """
+        if not value:
+            return math.nan
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+
+    @staticmethod
+    def hours_since_activity(
+        last_active_at: Optional[datetime],
+        last_login_at: Optional[datetime],
+        now: datetime,
+    ) -> Optional[float]:
+        """
+        Get the hours since a user's most recent activity.
+        
+        Args:
+            last_active_at: When the user was last active
+            last_login_at: When the user last logged in
+            now: Current time (timezone-aware)
+            
+        Returns:
+            Hours since the most recent activity, None without activity data
+        """
+        last_active_ts = AdvancedScoringService.epoch_seconds(last_active_at)
+        last_login_ts = AdvancedScoringService.epoch_seconds(last_login_at)
+        
+        # Use the most recent activity indicator
+        if math.isnan(last_active_ts):
+            if math.isnan(last_login_ts):
+                return None
+            most_recent = last_login_ts
+        elif math.isnan(last_login_ts):
+            most_recent = last_active_ts
+        else:
+            most_recent = max(last_active_ts, last_login_ts)
+        
+        return (now.timestamp() - most_recent) / 3600
+
+    @staticmethod
+    def hours_since_activities(
+        last_active_ts: np.ndarray,
+        last_login_ts: np.ndarray,
+        now_ts: float,
+    ) -> np.ndarray:
+        """
+        Get the hours since the most recent activity of many users at once.
+        
+        Same operations as hours_since_activity, so hours are identical.
+        
+        Args:
+            last_active_ts: Epoch seconds of each user's last activity (NaN if unknown)
+            last_login_ts: Epoch seconds of each user's last login (NaN if unknown)
+            now_ts: Epoch seconds of the current time
+            
+        Returns:
+            Hours since the most recent of the two, NaN without activity data
+        """
+        # fmax ignores a missing value unless both are missing
+        return (now_ts - np.fmax(last_active_ts, last_login_ts)) / 3600
+
     @staticmethod
     def calculate_response_rate_score(
         messages_sent: int,
@@ -99,43 +239,47 @@ class AdvancedScoringService:
         Returns:
             Response rate score between 0.0 and 1.0
         """
-        # No matches yet - return neutral score
-        if matches_count == 0:
-            return 0.7  # Give benefit of doubt to new users
-        
-        # No messages exchanged - low score
-        if messages_sent == 0 and messages_received == 0:
-            return 0.3
-        
-        # Calculate response ratio
-        # Ideal ratio is close to 1.0 (balanced conversation)
-        if messages_received == 0:
-            # User sends messages but gets no replies - moderate score
-            return 0.5
-        
-        if messages_sent == 0:
-            # User receives but doesn't respond - low score
-            return 0.2
-        
-        # Calculate ratio (balanced around 1.0)
-        ratio = messages_sent / messages_received
-        
-        # Optimal range: 0.7 to 1.5 (slightly favoring responsive users)
-        if 0.7 <= ratio <= 1.5:
-            score = 1.0
-        elif ratio < 0.7:
-            # Not responsive enough
-            score = max(0.2, ratio / 0.7)
-        else:
-            # Too eager (potential spam/desperate behavior)
-            score = max(0.5, 1.0 - (ratio - 1.5) * 0.2)
+        # Many users share the same small counts, distinct triples are few
+        return _response_rate_score(messages_sent, messages_received, matches_count)
+
+    @staticmethod
+    def calculate_response_rate_scores(
+        messages_sent: np.ndarray,
+        messages_received: np.ndarray,
+        matches_count: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Calculate response rate scores of many users at once.
         
-        # Adjust based on absolute activity level
-        # Users with higher absolute message counts get slight bonus
-        message_activity = min(messages_sent + messages_received, 100) / 100
-        activity_bonus = message_activity * 0.1
+        Applies the same rules, with the same operations, as
+        calculate_response_rate_score, so scores are identical.
         
-        return min(1.0, score + activity_bonus)
+        Args:
+            messages_sent: Number of messages sent by each user
+            messages_received: Number of messages received by each user
+            matches_count: Total number of matches of each user
+            
+        Returns:
+            Response rate scores between 0.0 and 1.0
+        """
+        sent = np.asarray(messages_sent, dtype=np.int64)
+        received = np.asarray(messages_received, dtype=np.int64)
+        matches = np.asarray(matches_count, dtype=np.int64)
+        
+        # Users without received messages are decided by the rules below
+        ratio = sent / np.maximum(received, 1)
+        ratio_score = np.select(
+            [(ratio >= 0.7) & (ratio <= 1.5), ratio < 0.7],
+            [1.0, np.maximum(0.2, ratio / 0.7)],
+            np.maximum(0.5, 1.0 - (ratio - 1.5) * 0.2),
+        )
+        activity_bonus = (np.minimum(sent + received, 100) / 100) * 0.1
+        
+        return np.select(
+            [matches == 0, (sent == 0) & (received == 0), received == 0, sent == 0],
+            [NO_MATCHES_RESPONSE_RATE_SCORE, 0.3, 0.5, 0.2],
+            np.minimum(1.0, ratio_score + activity_bonus),
+        )
 
     @staticmethod
     def calculate_reciprocity_score(
@@ -182,6 +326,24 @@ class AdvancedScoringService:
         
         return min(1.0, max(0.0, reciprocity))
 
+    @staticmethod
+    def is_cold_profile(user_data: Dict) -> bool:
+        """
+        Check whether a user has neither activity timestamps nor matches.
+        
+        Such users get the neutral activity and response rate scores.
+        
+        Args:
+            user_data: Dictionary containing user's data
+            
+        Returns:
+            True if the user has no activity or match history
+        """
+        return (
+            not (user_data.get("lastActiveAt") or user_data.get("lastLoginAt"))
+            and user_data.get("matchesCount", 0) == 0
+        )
+
     @classmethod
     def calculate_advanced_score(
         cls,
@@ -200,35 +362,44 @@ class AdvancedScoringService:
         Returns:
             Dictionary with detailed scores and final advanced score
         """
-        # Extract user activity data
-        user_activity = cls.calculate_activity_score(
-            last_active_at=user_data.get("lastActiveAt"),
-            last_login_at=user_data.get("lastLoginAt"),
-            account_created_at=user_data.get("createdAt", datetime.now()),
-        )
-        
-        target_activity = cls.calculate_activity_score(
-            last_active_at=target_user_data.get("lastActiveAt"),
-            last_login_at=target_user_data.get("lastLoginAt"),
-            account_created_at=target_user_data.get("createdAt", datetime.now()),
-        )
+        if cls.is_cold_profile(user_data) and cls.is_cold_profile(target_user_data):
+            # New users on both sides: every activity and response factor
+            # is the scorers' neutral value, no need to compute them
+            user_activity = target_activity = NO_ACTIVITY_SCORE
+            user_response = target_response = NO_MATCHES_RESPONSE_RATE_SCORE
+        else:
+            # Extract user activity data, both users measured against the same time
+            now = datetime.now(timezone.utc)
+            user_activity = cls.calculate_activity_score(
+                last_active_at=user_data.get("lastActiveAt"),
+                last_login_at=user_data.get("lastLoginAt"),
+                account_created_at=user_data.get("createdAt"),
+                now=now,
+            )
+            
+            target_activity = cls.calculate_activity_score(
+                last_active_at=target_user_data.get("lastActiveAt"),
+                last_login_at=target_user_data.get("lastLoginAt"),
+                account_created_at=target_user_data.get("createdAt"),
+                now=now,
+            )
+            
+            # Calculate response rate for both users
+            user_response = cls.calculate_response_rate_score(
+                messages_sent=user_data.get("messagesSent", 0),
+                messages_received=user_data.get("messagesReceived", 0),
+                matches_count=user_data.get("matchesCount", 0),
+            )
+            
+            target_response = cls.calculate_response_rate_score(
+                messages_sent=target_user_data.get("messagesSent", 0),
+                messages_received=target_user_data.get("messagesReceived", 0),
+                matches_count=target_user_data.get("matchesCount", 0),
+            )
         
         # Average activity score (both users should be active)
         activity_score = (user_activity + target_activity) / 2
         
-        # Calculate response rate for both users
-        user_response = cls.calculate_response_rate_score(
-            messages_sent=user_data.get("messagesSent", 0),
-            messages_received=user_data.get("messagesReceived", 0),
-            matches_count=user_data.get("matchesCount", 0),
-        )
-        
-        target_response = cls.calculate_response_rate_score(
-            messages_sent=target_user_data.get("messagesSent", 0),
-            messages_received=target_user_data.get("messagesReceived", 0),
-            matches_count=target_user_data.get("matchesCount", 0),
-        )
-        
         # Average response rate
         response_rate_score = (user_response + target_response) / 2
         
@@ -260,3 +431,101 @@ class AdvancedScoringService:
                 "targetResponseRate": round(target_response, 3),
             },
         }
+
+    @classmethod
+    def calculate_advanced_score_batch(
+        cls,
+        user_data: Dict,
+        targets: Dict[str, np.ndarray],
+        personality_compatibility: np.ndarray,
+        now: Optional[datetime] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Calculate advanced scores of one user against many targets.
+        
+        Targets are given as one array per field. Factors are computed with
+        the same operations as calculate_advanced_score, in a single compiled
+        pass when numba is installed, so unrounded scores are identical to
+        the per-pair ones.
+        
+        Args:
+            user_data: Dictionary containing user's data
+            targets: Arrays aligned with the targets, keyed by hoursSinceActivity
+                (NaN without activity data), messagesSent, messagesReceived,
+                matchesCount, mutualInterests and dealbreakerAlignment
+            personality_compatibility: Base personality compatibility scores (0.0-1.0)
+            now: Time the target hours were measured at, read from the clock
+                if not provided
+            
+        Returns:
+            Dictionary of unrounded score arrays keyed like calculate_advanced_score
+            results, with userActivity and userResponseRate as floats
+        """
+        user_activity = cls.calculate_activity_score(
+            last_active_at=user_data.get("lastActiveAt"),
+            last_login_at=user_data.get("lastLoginAt"),
+            account_created_at=user_data.get("createdAt"),
+            now=now,
+        )
+        user_response = cls.calculate_response_rate_score(
+            messages_sent=user_data.get("messagesSent", 0),
+            messages_received=user_data.get("messagesReceived", 0),
+            matches_count=user_data.get("matchesCount", 0),
+        )
+        if advanced_factors is not None:
+            (
+                target_activity,
+                target_response,
+                activity_score,
+                response_rate_score,
+                reciprocity_score,
+                final_score,
+            ) = advanced_factors(
+                targets["hoursSinceActivity"],
+                targets["messagesSent"],
+                targets["messagesReceived"],
+                targets["matchesCount"],
+                targets["mutualInterests"],
+                targets["dealbreakerAlignment"],
+                personality_compatibility,
+                user_activity,
+                user_response,
+                cls.ACTIVITY_WEIGHT,
+                cls.RESPONSE_RATE_WEIGHT,
+                cls.RECIPROCITY_WEIGHT,
+            )
+        else:
+            target_activity = cls.calculate_activity_scores(targets["hoursSinceActivity"])
+            target_response = cls.calculate_response_rate_scores(
+                targets["messagesSent"],
+                targets["messagesReceived"],
+                targets["matchesCount"],
+            )
+            
+            activity_score = (user_activity + target_activity) / 2
+            response_rate_score = (user_response + target_response) / 2
+            
+            interest_score = np.minimum(1.0, targets["mutualInterests"] / 5)
+            reciprocity = (
+                targets["dealbreakerAlignment"] * 0.40
+                + personality_compatibility * 0.35
+                + interest_score * 0.25
+            )
+            reciprocity_score = np.minimum(1.0, np.maximum(0.0, reciprocity))
+            
+            final_score = (
+                activity_score * cls.ACTIVITY_WEIGHT
+                + response_rate_score * cls.RESPONSE_RATE_WEIGHT
+                + reciprocity_score * cls.RECIPROCITY_WEIGHT
+            )
+        
+        return {
+            "activityScore": activity_score,
+            "responseRateScore": response_rate_score,
+            "reciprocityScore": reciprocity_score,
+            "advancedScore": final_score,
+            "userActivity": user_activity,
+            "targetActivity": target_activity,
+            "userResponseRate": user_response,
+            "targetResponseRate": target_response,
+        }
@@ -5,14 +5,88 @@ This module provides caching functionality to improve performance
 and reduce redundant calculations.
 """
 
-import json
+import hashlib
 import logging
-from typing import Optional, Dict, Any
+import socket
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Hashable, List, Tuple
+import orjson
 import redis
 from redis.exceptions import RedisError
 
 logger = logging.getLogger(__name__)
 
+# Redis hash holding algorithm statistics shared across workers
+STATS_KEY = "matching:stats"
+
+# Serialized results at least this large are stored compressed
+COMPRESS_MIN_BYTES = 256
+
+# Preset deflate dictionary holding the keys of compatibility results, so
+# even single small payloads compress well (V2 results shrink ~6x). Changing
+# it makes existing compressed entries unreadable: bump the marker with it.
+_COMPRESSION_DICT = (
+    b'{"compatibilityScore":,"version":"v2","details":{"communication":0.,'
+    b'"values":0.,"lifestyle":0.,"personality":0.},"advancedFactors":'
+    b'{"activityScore":0.,"responseRateScore":0.,"reciprocityScore":0.,'
+    b'"details":{"userActivity":0.,"targetActivity":0.,"userResponseRate":0.,'
+    b'"targetResponseRate":0.}},"sharedInterests":[],"scoringWeights":'
+    b'{"personalityWeight":0.6,"advancedWeight":0.4}}'
+)
+# First byte of compressed entries; JSON entries start with "{"
+_COMPRESSED_MARKER = b"\x01"
+
+
+def _encode(result: Dict[str, Any]) -> bytes:
+    """Serialize a result for Redis, compressing large payloads."""
+    payload = orjson.dumps(result)
+    if len(payload) < COMPRESS_MIN_BYTES:
+        return payload
+    compressor = zlib.compressobj(
+        1, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=_COMPRESSION_DICT
+    )
+    return _COMPRESSED_MARKER + compressor.compress(payload) + compressor.flush()
+
+
+def _payload(value: bytes) -> Optional[bytes]:
+    """Recover the JSON payload of a result stored by _encode, None if corrupt."""
+    if value[:1] == _COMPRESSED_MARKER:
+        decompressor = zlib.decompressobj(-zlib.MAX_WBITS, zdict=_COMPRESSION_DICT)
+        try:
+            payload = decompressor.decompress(value[1:])
+        except zlib.error as e:
+            logger.warning(f"Corrupt compressed cache entry: {e}")
+            return None
+        # Truncated streams decompress without error but never reach the end
+        if not decompressor.eof:
+            logger.warning("Truncated compressed cache entry")
+            return None
+        return payload
+    return value
+
+
+def _decode(value: bytes) -> Optional[Dict[str, Any]]:
+    """Deserialize a result stored by _encode, None if corrupt."""
+    payload = _payload(value)
+    if payload is None:
+        return None
+    try:
+        return orjson.loads(payload)
+    except orjson.JSONDecodeError as e:
+        logger.warning(f"Corrupt cache entry: {e}")
+        return None
+
+
+# TCP keepalive probes for pooled connections (options are platform specific)
+_KEEPALIVE_OPTIONS = {
+    option: value
+    for name, value in (("TCP_KEEPIDLE", 60), ("TCP_KEEPINTVL", 30), ("TCP_KEEPCNT", 3))
+    if (option := getattr(socket, name, None)) is not None
+}
+
 
 class CacheService:
     """Redis-based cache service for compatibility results."""
@@ -24,6 +98,7 @@ class CacheService:
         db: int = 0,
         ttl: int = 3600,  # 1 hour default TTL
         enabled: bool = True,
+        max_connections: int = 64,
     ):
         """
         Initialize cache service.
@@ -34,6 +109,7 @@ class CacheService:
             db: Redis database number
             ttl: Time-to-live for cached entries in seconds
             enabled: Whether caching is enabled
+            max_connections: Size of the connection pool shared by request threads
         """
         self.ttl = ttl
         self.enabled = enabled
@@ -41,14 +117,25 @@ class CacheService:
         
         if enabled:
             try:
-                self.redis_client = redis.Redis(
+                # Threads wait briefly for a free connection instead of failing,
+                # idle connections are kept alive and checked before reuse.
+                # Replies are parsed by hiredis, picked up by redis-py when installed
+                pool = redis.BlockingConnectionPool(
                     host=host,
                     port=port,
                     db=db,
-                    decode_responses=True,
+                    max_connections=max_connections,
+                    timeout=2,
+                    # Values are stored as orjson bytes, decoded without a str step
+                    decode_responses=False,
                     socket_connect_timeout=5,
                     socket_timeout=5,
+                    socket_keepalive=True,
+                    socket_keepalive_options=_KEEPALIVE_OPTIONS,
+                    health_check_interval=30,
+                    client_name="matching-service",
                 )
+                self.redis_client = redis.Redis(connection_pool=pool)
                 # Test connection
                 self.redis_client.ping()
                 logger.info(f"Redis cache connected to {host}:{port}")
@@ -57,23 +144,92 @@ class CacheService:
                 self.enabled = False
                 self.redis_client = None
     
-    def _make_key(self, user1_id: str, user2_id: str, version: str = "v1") -> str:
+    @staticmethod
+    def fingerprint_digest(fingerprint: Hashable) -> bytes:
+        """
+        Digest a profile fingerprint for use in cache keys.
+        
+        Args:
+            fingerprint: Profile fingerprint built by CompatibilityCalculator
+            
+        Returns:
+            Fixed-size digest bytes, stable across processes
+        """
+        # orjson serializes fingerprints several times faster than repr()
+        payload = orjson.dumps(fingerprint, default=repr)
+        return hashlib.blake2b(payload, digest_size=16).digest()
+    
+    def _make_key(
+        self,
+        user1_id: str,
+        user2_id: str,
+        version: str = "v1",
+        fingerprints: Optional[Tuple[bytes, bytes]] = None,
+    ) -> bytes:
         """
         Create a cache key for a compatibility calculation.
         
+        The user IDs are hashed into a fixed-size digest, so keys stay short
+        in Redis memory and on the wire (MGET of a batch sends every key).
+        Entries are found for invalidation through the per-user index sets.
+        Keys keep the user order: results are from user 1's perspective
+        (V1 breakdowns follow user 1's answers, V2 checks user 1's
+        preferences).
+        
         Args:
             user1_id: First user ID
             user2_id: Second user ID
             version: Algorithm version (v1 or v2)
+            fingerprints: Optional fingerprint digests of both profiles; when
+                given, entries cached before a profile changed are missed
             
         Returns:
-            Cache key string
+            Cache key bytes
         """
-        # Sort user IDs to ensure consistency regardless of order
-        sorted_ids = tuple(sorted([user1_id, user2_id]))
-        return f"compatibility:{version}:{sorted_ids[0]}:{sorted_ids[1]}"
+        data = f"{user1_id}|{user2_id}".encode()
+        if fingerprints is not None:
+            data += b"|" + fingerprints[0] + fingerprints[1]
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        return b"c:" + version.encode() + b":" + digest
     
-    def get(self, user1_id: str, user2_id: str, version: str = "v1") -> Optional[Dict[str, Any]]:
+    @staticmethod
+    def _make_user_index_key(user_id: str) -> str:
+        """
+        Create the key of the set indexing a user's cached results.
+        
+        Args:
+            user_id: User ID
+            
+        Returns:
+            Index set key string
+        """
+        return f"user_keys:{user_id}"
+    
+    def _index_keys(self, pipe: redis.client.Pipeline, user_id: str, keys: List[bytes], ttl: int) -> None:
+        """
+        Queue adding cached result keys to a user's index set on a pipeline.
+        
+        The set lives at least as long as the results it indexes: its TTL
+        is set when it is created and only ever extended afterwards.
+        
+        Args:
+            pipe: Pipeline to queue the commands on
+            user_id: User ID
+            keys: Cached result keys involving the user
+            ttl: TTL of the cached results in seconds
+        """
+        index_key = self._make_user_index_key(user_id)
+        pipe.sadd(index_key, *keys)
+        pipe.expire(index_key, ttl, nx=True)
+        pipe.expire(index_key, ttl, gt=True)
+    
+    def get(
+        self,
+        user1_id: str,
+        user2_id: str,
+        version: str = "v1",
+        fingerprints: Optional[Tuple[bytes, bytes]] = None,
+    ) -> Optional[Dict[str, Any]]:
         """
         Retrieve cached compatibility result.
         
@@ -81,22 +237,48 @@ class CacheService:
             user1_id: First user ID
             user2_id: Second user ID
             version: Algorithm version
+            fingerprints: Optional fingerprint digests of both profiles
             
         Returns:
             Cached result dictionary or None if not found
         """
+        payload = self.get_json(user1_id, user2_id, version, fingerprints)
+        return _decode(payload) if payload else None
+    
+    def get_json(
+        self,
+        user1_id: str,
+        user2_id: str,
+        version: str = "v1",
+        fingerprints: Optional[Tuple[bytes, bytes]] = None,
+    ) -> Optional[bytes]:
+        """
+        Retrieve a cached compatibility result as its JSON encoding.
+        
+        Lets callers serve a hit as-is without parsing and re-serializing it.
+        
+        Args:
+            user1_id: First user ID
+            user2_id: Second user ID
+            version: Algorithm version
+            fingerprints: Optional fingerprint digests of both profiles
+            
+        Returns:
+            JSON-encoded result or None if not found
+        """
         if not self.enabled or not self.redis_client:
             return None
         
         try:
-            key = self._make_key(user1_id, user2_id, version)
+            key = self._make_key(user1_id, user2_id, version, fingerprints)
             cached = self.redis_client.get(key)
             
-            if cached:
-                logger.debug(f"Cache hit for {key}")
-                return json.loads(cached)
+            payload = _payload(cached) if cached else None
+            if payload:
+                logger.debug("Cache hit for %s", key)
+                return payload
             
-            logger.debug(f"Cache miss for {key}")
+            logger.debug("Cache miss for %s", key)
             return None
             
         except RedisError as e:
@@ -110,6 +292,7 @@ class CacheService:
         result: Dict[str, Any],
         version: str = "v1",
         ttl: Optional[int] = None,
+        fingerprints: Optional[Tuple[bytes, bytes]] = None,
     ) -> bool:
         """
         Cache a compatibility result.
@@ -120,6 +303,7 @@ class CacheService:
             result: Compatibility result to cache
             version: Algorithm version
             ttl: Optional custom TTL (uses default if not provided)
+            fingerprints: Optional fingerprint digests of both profiles
             
         Returns:
             True if cached successfully, False otherwise
@@ -128,30 +312,148 @@ class CacheService:
             return False
         
         try:
-            key = self._make_key(user1_id, user2_id, version)
+            key = self._make_key(user1_id, user2_id, version, fingerprints)
             ttl_to_use = ttl if ttl is not None else self.ttl
             
-            self.redis_client.setex(
-                key,
-                ttl_to_use,
-                json.dumps(result),
-            )
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.setex(key, ttl_to_use, _encode(result))
+            self._index_keys(pipe, user1_id, [key], ttl_to_use)
+            self._index_keys(pipe, user2_id, [key], ttl_to_use)
+            pipe.execute()
             
-            logger.debug(f"Cached result for {key} with TTL {ttl_to_use}s")
+            logger.debug("Cached result for %s with TTL %ss", key, ttl_to_use)
             return True
             
         except RedisError as e:
             logger.error(f"Redis set error: {e}")
             return False
     
-    def invalidate(self, user1_id: str, user2_id: str, version: str = "v1") -> bool:
+    def get_many(
+        self,
+        user_id: str,
+        other_ids: List[str],
+        version: str = "v1",
+        fingerprint: Optional[bytes] = None,
+        other_fingerprints: Optional[List[bytes]] = None,
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Retrieve cached compatibility results of one user with many others.
+        
+        All keys are fetched with a single MGET round-trip.
+        
+        Args:
+            user_id: User ID
+            other_ids: IDs of the other users
+            version: Algorithm version
+            fingerprint: Optional fingerprint digest of the user's profile
+            other_fingerprints: Fingerprint digests of the other profiles,
+                aligned with other_ids (required with fingerprint)
+            
+        Returns:
+            Cached result dictionaries (None if not found), aligned with other_ids
+        """
+        if not self.enabled or not self.redis_client or not other_ids:
+            return [None] * len(other_ids)
+        
+        try:
+            if fingerprint is None:
+                keys = [self._make_key(user_id, other_id, version) for other_id in other_ids]
+            else:
+                keys = [
+                    self._make_key(user_id, other_id, version, (fingerprint, other_fingerprint))
+                    for other_id, other_fingerprint in zip(other_ids, other_fingerprints)
+                ]
+            cached = self.redis_client.mget(keys)
+            results = [_decode(value) if value else None for value in cached]
+            
+            logger.debug(
+                "Cache hits for %s: %d of %d",
+                user_id,
+                len(results) - results.count(None),
+                len(results),
+            )
+            return results
+            
+        except RedisError as e:
+            logger.error(f"Redis mget error: {e}")
+            return [None] * len(other_ids)
+    
+    def set_many(
+        self,
+        user_id: str,
+        results: Dict[str, Dict[str, Any]],
+        version: str = "v1",
+        ttl: Optional[int] = None,
+        fingerprint: Optional[bytes] = None,
+        other_fingerprints: Optional[Dict[str, bytes]] = None,
+    ) -> bool:
+        """
+        Cache compatibility results of one user with many others.
+        
+        All results are written in a single pipelined round-trip.
+        
+        Args:
+            user_id: User ID
+            results: Compatibility results keyed by the other user's ID
+            version: Algorithm version
+            ttl: Optional custom TTL (uses default if not provided)
+            fingerprint: Optional fingerprint digest of the user's profile
+            other_fingerprints: Fingerprint digests of the other profiles,
+                keyed by their user ID (required with fingerprint)
+            
+        Returns:
+            True if cached successfully, False otherwise
+        """
+        if not self.enabled or not self.redis_client:
+            return False
+        
+        if not results:
+            return True
+        
+        try:
+            ttl_to_use = ttl if ttl is not None else self.ttl
+            pipe = self.redis_client.pipeline(transaction=False)
+            keys = []
+            for other_id, result in results.items():
+                if fingerprint is None:
+                    key = self._make_key(user_id, other_id, version)
+                else:
+                    key = self._make_key(
+                        user_id, other_id, version, (fingerprint, other_fingerprints[other_id])
+                    )
+                keys.append(key)
+                pipe.setex(key, ttl_to_use, _encode(result))
+                self._index_keys(pipe, other_id, [key], ttl_to_use)
+            self._index_keys(pipe, user_id, keys, ttl_to_use)
+            pipe.execute()
+            
+            logger.debug("Cached %d results for %s with TTL %ss", len(results), user_id, ttl_to_use)
+            return True
+            
+        except RedisError as e:
+            logger.error(f"Redis pipeline set error: {e}")
+            return False
+    
+    def invalidate(
+        self,
+        user1_id: str,
+        user2_id: str,
+        version: str = "v1",
+        fingerprints: Optional[Tuple[bytes, bytes]] = None,
+    ) -> bool:
         """
-        Invalidate a cached compatibility result.
+        Invalidate the cached compatibility results of a pair.
+        
+        Results are cached from each user's side, so both directions are
+        deleted. Entries are keyed by the fingerprints of the profiles they
+        were computed for; use clear_user_cache when those are not known.
         
         Args:
             user1_id: First user ID
             user2_id: Second user ID
             version: Algorithm version
+            fingerprints: Fingerprint digests of both profiles, as passed
+                when the results were cached
             
         Returns:
             True if invalidated successfully, False otherwise
@@ -160,11 +462,15 @@ class CacheService:
             return False
         
         try:
-            key = self._make_key(user1_id, user2_id, version)
-            deleted = self.redis_client.delete(key)
+            reverse = fingerprints[::-1] if fingerprints is not None else None
+            keys = (
+                self._make_key(user1_id, user2_id, version, fingerprints),
+                self._make_key(user2_id, user1_id, version, reverse),
+            )
+            deleted = self.redis_client.delete(*keys)
             
             if deleted:
-                logger.debug(f"Invalidated cache for {key}")
+                logger.debug("Invalidated cache for %s", keys)
             
             return bool(deleted)
             
@@ -176,7 +482,8 @@ class CacheService:
         """
         Clear all cached results for a specific user.
         
-        Useful when a user updates their profile or preferences.
+        Useful when a user updates their profile or preferences. Keys are
+        read from the user's index set instead of scanning the keyspace.
         
         Args:
             user_id: User ID to clear cache for
@@ -188,12 +495,14 @@ class CacheService:
             return 0
         
         try:
-            # Find all keys containing this user ID
-            pattern = f"compatibility:*:*{user_id}*"
-            keys = list(self.redis_client.scan_iter(match=pattern))
+            index_key = self._make_user_index_key(user_id)
+            keys = self.redis_client.smembers(index_key)
             
             if keys:
-                deleted = self.redis_client.delete(*keys)
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.delete(*keys)
+                pipe.delete(index_key)
+                deleted = pipe.execute()[0]
                 logger.info(f"Cleared {deleted} cached entries for user {user_id}")
                 return deleted
             
@@ -203,6 +512,68 @@ class CacheService:
             logger.error(f"Redis clear user cache error: {e}")
             return 0
     
+    def increment_stats(
+        self,
+        calculations: int,
+        score_sum: float,
+        v2_calculations: int = 0,
+        last_update: Optional[str] = None,
+    ) -> bool:
+        """
+        Atomically increment the shared algorithm statistics.
+        
+        Args:
+            calculations: Number of calculations to add
+            score_sum: Sum of the compatibility scores of these calculations
+            v2_calculations: Number of V2 calculations to add
+            last_update: Timestamp of the update
+            
+        Returns:
+            True if updated successfully, False otherwise
+        """
+        if not self.enabled or not self.redis_client:
+            return False
+        
+        try:
+            pipe = self.redis_client.pipeline(transaction=True)
+            pipe.hincrby(STATS_KEY, "total_calculations", calculations)
+            pipe.hincrby(STATS_KEY, "total_v2_calculations", v2_calculations)
+            pipe.hincrbyfloat(STATS_KEY, "total_score", score_sum)
+            if last_update:
+                pipe.hset(STATS_KEY, "last_update", last_update)
+            pipe.execute()
+            return True
+            
+        except RedisError as e:
+            logger.error(f"Redis stats update error: {e}")
+            return False
+    
+    def get_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        Retrieve the shared algorithm statistics.
+        
+        Returns:
+            Statistics dictionary or None if unavailable
+        """
+        if not self.enabled or not self.redis_client:
+            return None
+        
+        try:
+            raw = self.redis_client.hgetall(STATS_KEY)
+            if not raw:
+                return None
+            
+            return {
+                "total_calculations": int(raw.get(b"total_calculations", 0)),
+                "total_v2_calculations": int(raw.get(b"total_v2_calculations", 0)),
+                "total_score": float(raw.get(b"total_score", 0.0)),
+                "last_update": raw.get(b"last_update", b"").decode(),
+            }
+            
+        except RedisError as e:
+            logger.error(f"Redis get stats error: {e}")
+            return None
+    
     def health_check(self) -> bool:
         """
         Check if Redis is available.
@@ -217,3 +588,87 @@ class CacheService:
             return self.redis_client.ping()
         except RedisError:
             return False
+
+
+class LocalCache:
+    """
+    In-process bounded LRU cache with TTL for compatibility results.
+
+    Shared by handlers on the event loop and in the threadpool, so every
+    operation holds a lock.
+    """
+
+    def __init__(self, maxsize: int = 100_000, ttl: int = 3600):
+        """
+        Initialize local cache.
+
+        Args:
+            maxsize: Maximum number of entries, least recently used are evicted
+            ttl: Time-to-live for cached entries in seconds
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Retrieve a cached value.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value or None if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Cache a value, evicting the least recently used entry if full.
+
+        Args:
+            key: Cache key
+            value: Value to cache
+        """
+        if self.maxsize <= 0:
+            return
+
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all cached entries and reset hit counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache (0.0 before any lookup)."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
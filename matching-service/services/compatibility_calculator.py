@@ -5,8 +5,183 @@ This module handles the calculation of compatibility scores between users,
 integrating both V1 (personality-based) and V2 (advanced) scoring algorithms.
 """
 
-from typing import Dict, List, Optional
+import math
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
 from .advanced_scoring import AdvancedScoringService
+from .kernels import score_answers
+
+# Category buckets reported in the personality breakdown
+CATEGORIES = ("communication", "values", "lifestyle", "personality")
+_CATEGORY_INDEX = {name: idx for idx, name in enumerate(CATEGORIES)}
+
+# Genders of main-api (man, woman, non_binary, other) and of the database
+# GenderEnum (male, female, other), mapped to main-api's
+GENDER_ALIASES = {
+    "man": "man",
+    "male": "man",
+    "woman": "woman",
+    "female": "woman",
+    "non_binary": "non_binary",
+    "other": "other",
+}
+
+# Bit of each gender in basic filtering masks
+_GENDER_BITS = {"man": 1, "woman": 2, "non_binary": 4, "other": 8}
+
+# Neutral result used when one of the users has no personality answers
+_NEUTRAL_PERSONALITY_RESULT = {
+    "personalityScore": 0.5,
+    "communication": 0.5,
+    "values": 0.5,
+    "lifestyle": 0.5,
+    "personality": 0.5,
+}
+
+
+def _answers_key(answers: List[Dict]) -> Tuple:
+    """Build a hashable key from the fields used in personality scoring."""
+    return tuple(
+        (
+            answer["questionId"],
+            answer.get("numericAnswer"),
+            answer.get("booleanAnswer"),
+            tuple(answer.get("multipleChoiceAnswer") or ()),
+            answer.get("textAnswer"),
+            answer.get("category", "personality"),
+        )
+        for answer in answers
+    )
+
+
+@lru_cache(maxsize=4096)
+def _compile_base_answers(key: Tuple) -> Tuple:
+    """
+    Compile a user's answers into per-question columns for batch scoring.
+
+    Cached so that a user scored in several batches (e.g. daily selection
+    regenerated for the same user) only pays for this once. Returned arrays
+    are read-only since they are shared between calls.
+
+    Args:
+        key: Answers key built by _answers_key
+
+    Returns:
+        Tuple of (columns, numeric, boolean, category), where columns holds
+        per question (question_id, has_numeric, has_boolean, choices, text)
+        for gathering candidate answers
+    """
+    num_questions = len(key)
+    numeric = np.full(num_questions, np.nan)
+    boolean = np.full(num_questions, -1, dtype=np.int8)
+    choices: List[Optional[frozenset]] = [None] * num_questions
+    text: List[Optional[str]] = [None] * num_questions
+    category = np.full(num_questions, -1, dtype=np.int8)
+
+    for j, (_, numeric_answer, boolean_answer, choice_answer, text_answer, cat) in enumerate(key):
+        if numeric_answer is not None:
+            numeric[j] = numeric_answer
+        if boolean_answer is not None:
+            boolean[j] = bool(boolean_answer)
+        if choice_answer:
+            choices[j] = frozenset(choice_answer)
+        if text_answer:
+            text[j] = text_answer.lower()
+        category[j] = _CATEGORY_INDEX.get(cat, -1)
+
+    for array in (numeric, boolean, category):
+        array.flags.writeable = False
+
+    columns = tuple(zip(
+        (entry[0] for entry in key),
+        (~np.isnan(numeric)).tolist(),
+        (boolean >= 0).tolist(),
+        choices,
+        text,
+    ))
+    return columns, numeric, boolean, category
+
+
+def normalize_gender(value: Optional[str]) -> Optional[str]:
+    """
+    Map a gender from main-api's or the database's vocabulary to main-api's.
+
+    Args:
+        value: Gender string, e.g. "woman" or "female"
+
+    Returns:
+        Normalized gender, or None if missing or not recognized
+    """
+    if not value:
+        return None
+    return GENDER_ALIASES.get(value.strip().lower())
+
+
+def _profiles_to_soa(profiles: List[Dict]) -> Dict[str, np.ndarray]:
+    """
+    Lay out the fields used by basic filtering as one array per field.
+
+    Missing numeric values are NaN. Genders are normalized and encoded as
+    single-bit masks, and accepted genders (preferences gender and
+    interestedInGenders) as the OR of their bits. 0 stands for a missing or
+    unrecognized gender, or for no restriction.
+
+    Args:
+        profiles: Profile dictionaries
+
+    Returns:
+        Dictionary of arrays aligned with profiles
+    """
+
+    def as_float(value) -> float:
+        return np.nan if value is None else value
+
+    def as_bit(value) -> int:
+        return _GENDER_BITS.get(normalize_gender(value), 0)
+
+    def accepted_bits(preferences: Dict) -> int:
+        genders = list(preferences.get("interestedInGenders") or [])
+        genders.append(preferences.get("gender"))
+        if "any" in genders:
+            return 0
+        bits = 0
+        for gender in genders:
+            bits |= as_bit(gender)
+        return bits
+
+    # Numeric fields are gathered as rows of Python floats and converted in
+    # one call, then split into per-field column views
+    rows = []
+    genders = []
+    accepted = []
+    for profile in profiles:
+        preferences = profile.get("preferences") or {}
+        rows.append((
+            as_float(profile.get("age")),
+            as_float(preferences.get("minAge")),
+            as_float(preferences.get("maxAge")),
+            as_float(preferences.get("maxDistance")),
+            as_float(profile.get("latitude")),
+            as_float(profile.get("longitude")),
+        ))
+        genders.append(as_bit(profile.get("gender")))
+        accepted.append(accepted_bits(preferences))
+
+    numeric = np.array(rows, dtype=np.float64).reshape(len(profiles), 6)
+    return {
+        "age": numeric[:, 0],
+        "min_age": numeric[:, 1],
+        "max_age": numeric[:, 2],
+        "max_distance": numeric[:, 3],
+        "latitude": numeric[:, 4],
+        "longitude": numeric[:, 5],
+        "gender": np.array(genders, dtype=np.int64),
+        "accepted_genders": np.array(accepted, dtype=np.int64),
+    }
 
 
 class CompatibilityCalculator:
@@ -16,6 +191,25 @@ class CompatibilityCalculator:
     V1_WEIGHT = 0.6  # Personality-based scoring
     V2_WEIGHT = 0.4  # Advanced scoring (activity, response, reciprocity)
 
+    @staticmethod
+    def _jaccard_similarity(choices1: set, choices2: set) -> float:
+        """
+        Jaccard similarity between two sets of choices.
+
+        The union size is derived by inclusion-exclusion, so only the
+        intersection is materialized.
+
+        Args:
+            choices1: First set of choices
+            choices2: Second set of choices
+
+        Returns:
+            Similarity between 0 and 1 (0.0 when both sets are empty)
+        """
+        common = len(choices1 & choices2)
+        total = len(choices1) + len(choices2) - common
+        return common / total if total else 0.0
+
     @staticmethod
     def calculate_personality_score(
         user1_answers: List[Dict],
@@ -34,22 +228,12 @@ class CompatibilityCalculator:
             Dictionary with personality score and category breakdowns
         """
         if not user1_answers or not user2_answers:
-            return {
-                "personalityScore": 0.5,
-                "communication": 0.5,
-                "values": 0.5,
-                "lifestyle": 0.5,
-                "personality": 0.5,
-            }
+            return dict(_NEUTRAL_PERSONALITY_RESULT)
 
         total_score = 0.0
         common_questions = 0
-        category_scores = {
-            "communication": [],
-            "values": [],
-            "lifestyle": [],
-            "personality": [],
-        }
+        category_sums = [0.0] * len(CATEGORIES)
+        category_counts = [0] * len(CATEGORIES)
 
         # Create answer lookup for user2
         user2_answer_map = {a["questionId"]: a for a in user2_answers}
@@ -92,11 +276,10 @@ class CompatibilityCalculator:
                 and answer2["multipleChoiceAnswer"]
             ):
                 # For multiple choice questions
-                choices1 = set(answer1["multipleChoiceAnswer"])
-                choices2 = set(answer2["multipleChoiceAnswer"])
-                common = choices1 & choices2
-                total = choices1 | choices2
-                similarity = len(common) / len(total) if total else 0.0
+                similarity = CompatibilityCalculator._jaccard_similarity(
+                    set(answer1["multipleChoiceAnswer"]),
+                    set(answer2["multipleChoiceAnswer"]),
+                )
 
             elif (
                 "textAnswer" in answer1
@@ -113,29 +296,203 @@ class CompatibilityCalculator:
 
             total_score += similarity
 
-            # Categorize the question for detailed breakdown
-            category = answer1.get("category", "personality")
-            if category in category_scores:
-                category_scores[category].append(similarity)
+            # Categorize the question for detailed breakdown. Sums run in
+            # answer order like the batch kernels; sum() would differ since
+            # it compensates float rounding from Python 3.12 on
+            category = _CATEGORY_INDEX.get(answer1.get("category", "personality"))
+            if category is not None:
+                category_sums[category] += similarity
+                category_counts[category] += 1
 
         # Calculate overall personality score
         personality_score = total_score / common_questions if common_questions > 0 else 0.5
 
-        # Calculate category averages
-        category_averages = {}
-        for category, scores in category_scores.items():
-            if scores:
-                category_averages[category] = sum(scores) / len(scores)
-            else:
-                category_averages[category] = 0.5  # Neutral if no data
+        result = {"personalityScore": round(personality_score, 3)}
+        for category, total, count in zip(CATEGORIES, category_sums, category_counts):
+            # Neutral if no data
+            result[category] = round(total / count, 3) if count else 0.5
 
-        return {
-            "personalityScore": round(personality_score, 3),
-            "communication": round(category_averages.get("communication", 0.5), 3),
-            "values": round(category_averages.get("values", 0.5), 3),
-            "lifestyle": round(category_averages.get("lifestyle", 0.5), 3),
-            "personality": round(category_averages.get("personality", 0.5), 3),
-        }
+        return result
+
+    @staticmethod
+    def calculate_personality_score_batch(
+        user_answers: List[Dict],
+        candidates_answers: List[List[Dict]],
+    ) -> List[Dict[str, float]]:
+        """
+        Calculate V1 personality scores of one user against many candidates.
+
+        Candidate answers are aligned on the user's questions into (N, Q)
+        arrays so that similarities are computed for all candidates at once.
+        Results are identical to calling calculate_personality_score per pair.
+
+        Args:
+            user_answers: List of personality answers for the base user
+            candidates_answers: List of personality answer lists, one per candidate
+
+        Returns:
+            List of personality score dictionaries, aligned with candidates_answers
+        """
+        num_candidates = len(candidates_answers)
+        num_questions = len(user_answers)
+        if num_candidates == 0:
+            return []
+        if num_questions == 0:
+            return [dict(_NEUTRAL_PERSONALITY_RESULT) for _ in range(num_candidates)]
+
+        # Base user's answers, one column per answer
+        columns, base_numeric, base_boolean, base_category = _compile_base_answers(
+            _answers_key(user_answers)
+        )
+
+        # Candidate answers aligned on the base user's questions. Values are
+        # gathered into flat lists of (cell, value) and written to the (N, Q)
+        # arrays once, element-wise ndarray assignment is much slower.
+        present_cells: List[int] = []
+        numeric_cells: List[int] = []
+        numeric_values: List[float] = []
+        boolean_cells: List[int] = []
+        boolean_values: List[bool] = []
+        choices_cells: List[int] = []
+        choices_values: List[float] = []
+        text_cells: List[int] = []
+        text_values: List[float] = []
+        has_answers = [False] * num_candidates
+
+        for i, answers in enumerate(candidates_answers):
+            if not answers:
+                continue
+            has_answers[i] = True
+            answer_map = {a["questionId"]: a for a in answers}
+            row = i * num_questions
+
+            for j, (question_id, base_has_numeric, base_has_boolean, choices, text) in enumerate(
+                columns
+            ):
+                answer = answer_map.get(question_id)
+                if not answer:
+                    continue
+
+                cell = row + j
+                present_cells.append(cell)
+                # Answer types below the first shared one are never selected
+                if base_has_numeric and answer.get("numericAnswer") is not None:
+                    numeric_cells.append(cell)
+                    numeric_values.append(answer["numericAnswer"])
+                    continue
+                if base_has_boolean and answer.get("booleanAnswer") is not None:
+                    boolean_cells.append(cell)
+                    boolean_values.append(bool(answer["booleanAnswer"]))
+                    continue
+                if choices is not None and answer.get("multipleChoiceAnswer"):
+                    choices_cells.append(cell)
+                    choices_values.append(CompatibilityCalculator._jaccard_similarity(
+                        choices, set(answer["multipleChoiceAnswer"])
+                    ))
+                    continue
+                if text is not None and answer.get("textAnswer"):
+                    text_cells.append(cell)
+                    text_values.append(1.0 if text == answer["textAnswer"].lower() else 0.5)
+
+        shape = (num_candidates, num_questions)
+        present = np.zeros(shape, dtype=bool)
+        present.flat[present_cells] = True
+        numeric = np.full(shape, np.nan)
+        numeric.flat[numeric_cells] = numeric_values
+        boolean = np.full(shape, -1, dtype=np.int8)
+        boolean.flat[boolean_cells] = boolean_values
+        choices_similarity = np.full(shape, np.nan)
+        choices_similarity.flat[choices_cells] = choices_values
+        text_similarity = np.full(shape, np.nan)
+        text_similarity.flat[text_cells] = text_values
+
+        common_questions, total_scores, category_sums, category_counts = score_answers(
+            present,
+            numeric,
+            boolean,
+            choices_similarity,
+            text_similarity,
+            base_numeric,
+            base_boolean,
+            base_category,
+            len(CATEGORIES),
+        )
+
+        results = []
+        # Convert to Python scalars once rather than indexing arrays per value
+        for answered, common, total, sums, counts in zip(
+            has_answers,
+            common_questions.tolist(),
+            total_scores.tolist(),
+            category_sums.tolist(),
+            category_counts.tolist(),
+        ):
+            if not answered:
+                results.append(dict(_NEUTRAL_PERSONALITY_RESULT))
+                continue
+
+            personality_score = total / common if common > 0 else 0.5
+
+            result = {"personalityScore": round(personality_score, 3)}
+            for category, category_sum, count in zip(CATEGORIES, sums, counts):
+                result[category] = round(category_sum / count if count else 0.5, 3)
+            results.append(result)
+
+        return results
+
+    @staticmethod
+    def profile_fingerprint(profile: Dict) -> Tuple:
+        """
+        Hashable snapshot of the profile fields used by V1 scoring.
+
+        Two profiles with equal fingerprints get the same V1 results, so
+        fingerprints can key cached results without going stale when a
+        profile changes.
+
+        Args:
+            profile: Profile data
+
+        Returns:
+            Tuple of personality answers and interests
+        """
+        return (
+            _answers_key(profile.get("personalityAnswers") or []),
+            tuple(profile.get("interests") or ()),
+        )
+
+    @staticmethod
+    def profile_fingerprint_v2(profile: Dict) -> Tuple:
+        """
+        Hashable snapshot of the profile fields used by V2 scoring.
+
+        Extends profile_fingerprint with the dealbreaker and activity
+        fields. Activity scores also depend on the current time, so cached
+        V2 results still need a TTL.
+
+        Args:
+            profile: Profile data
+
+        Returns:
+            Tuple of the V1 fingerprint and the advanced scoring fields
+        """
+        preferences = profile.get("preferences") or {}
+        return (
+            CompatibilityCalculator.profile_fingerprint(profile),
+            profile.get("age"),
+            profile.get("gender"),
+            preferences.get("minAge", 18),
+            preferences.get("maxAge", 100),
+            preferences.get("maxDistance"),
+            preferences.get("gender"),
+            profile.get("latitude"),
+            profile.get("longitude"),
+            profile.get("lastActiveAt"),
+            profile.get("lastLoginAt"),
+            profile.get("createdAt"),
+            profile.get("messagesSent", 0),
+            profile.get("messagesReceived", 0),
+            profile.get("matchesCount", 0),
+        )
 
     @staticmethod
     def extract_shared_interests(
@@ -155,10 +512,48 @@ class CompatibilityCalculator:
         if not user1_interests or not user2_interests:
             return []
 
-        interests1 = set(i.lower() for i in user1_interests)
-        interests2 = set(i.lower() for i in user2_interests)
+        user1_set = frozenset(i.lower() for i in user1_interests)
+        return sorted(user1_set.intersection(i.lower() for i in user2_interests))
+
+    @staticmethod
+    def shared_interests_batch(
+        user_interests: List[str],
+        interest_lists: List[List[str]],
+    ) -> List[List[str]]:
+        """
+        Extract shared interests between one user and many others.
+
+        Each of the base user's lowercased interests gets one bit, numbered
+        in sorted order, so a candidate's overlap is the OR of its bits and
+        decodes straight into the sorted list. Candidates sharing the same
+        overlap reuse one decoding.
+
+        Args:
+            user_interests: Interests of the base user
+            interest_lists: Interests of each other user
+
+        Returns:
+            Sorted lists of shared interests, aligned with interest_lists
+        """
+        vocabulary = sorted({i.lower() for i in user_interests or ()})
+        bits = {interest: 1 << n for n, interest in enumerate(vocabulary)}.get
+
+        decoded: Dict[int, List[str]] = {}
+        results = []
+        for interests in interest_lists:
+            mask = 0
+            for interest in interests or ():
+                mask |= bits(interest.lower(), 0)
 
-        return sorted(list(interests1 & interests2))
+            shared = decoded.get(mask)
+            if shared is None:
+                shared = decoded[mask] = [
+                    interest for n, interest in enumerate(vocabulary) if mask >> n & 1
+                ]
+            # Results are cached and serialized independently
+            results.append(list(shared))
+
+        return results
 
     @classmethod
     def calculate_compatibility_v1(
@@ -200,6 +595,46 @@ class CompatibilityCalculator:
             "sharedInterests": shared_interests,
         }
 
+    @classmethod
+    def calculate_compatibility_v1_batch(
+        cls,
+        user_profile: Dict,
+        profiles: List[Dict],
+    ) -> List[Dict]:
+        """
+        Calculate V1 compatibility of one user against many profiles.
+
+        Args:
+            user_profile: Complete profile data for the base user
+            profiles: Complete profile data for each profile to compare
+
+        Returns:
+            V1 compatibility results, aligned with profiles
+        """
+        personality_results = cls.calculate_personality_score_batch(
+            user_answers=user_profile.get("personalityAnswers", []),
+            candidates_answers=[p.get("personalityAnswers", []) for p in profiles],
+        )
+
+        shared_interests = cls.shared_interests_batch(
+            user_profile.get("interests", []),
+            [p.get("interests", []) for p in profiles],
+        )
+        results = []
+        for shared, personality_result in zip(shared_interests, personality_results):
+            results.append({
+                "compatibilityScore": round(personality_result["personalityScore"] * 100, 1),
+                "details": {
+                    "communication": personality_result["communication"],
+                    "values": personality_result["values"],
+                    "lifestyle": personality_result["lifestyle"],
+                    "personality": personality_result["personality"],
+                },
+                "sharedInterests": shared,
+            })
+
+        return results
+
     @classmethod
     def calculate_compatibility_v2(
         cls,
@@ -248,6 +683,8 @@ class CompatibilityCalculator:
             ),
         }
 
+        # Reciprocity only uses the requesting user's dealbreaker alignment,
+        # so it is not computed in the other direction
         user2_data = {
             "lastActiveAt": user2_profile.get("lastActiveAt"),
             "lastLoginAt": user2_profile.get("lastLoginAt"),
@@ -256,9 +693,6 @@ class CompatibilityCalculator:
             "messagesReceived": user2_profile.get("messagesReceived", 0),
             "matchesCount": user2_profile.get("matchesCount", 0),
             "mutualInterests": len(shared_interests),
-            "dealbreakerAlignment": cls._calculate_dealbreaker_alignment(
-                user2_profile, user1_profile
-            ),
         }
 
         # Calculate advanced scores
@@ -299,10 +733,276 @@ class CompatibilityCalculator:
             },
         }
 
+    @classmethod
+    def calculate_compatibility_v2_batch(
+        cls,
+        user_profile: Dict,
+        profiles: List[Dict],
+        now: Optional[datetime] = None,
+    ) -> List[Dict]:
+        """
+        Calculate V2 compatibility of one user against many profiles.
+
+        Personality scores come from the batch V1 scoring, the base user's
+        activity and response rate are computed once, and the factor blend
+        is computed for all candidates at once. Results are identical to
+        calling calculate_compatibility_v2 per pair.
+
+        Args:
+            user_profile: Complete profile data for the base user
+            profiles: Complete profile data for each profile to compare
+            now: Current time (timezone-aware), read from the clock if not
+                provided
+
+        Returns:
+            V2 compatibility results, aligned with profiles
+        """
+        if not profiles:
+            return []
+
+        personality_results = cls.calculate_personality_score_batch(
+            user_answers=user_profile.get("personalityAnswers", []),
+            candidates_answers=[p.get("personalityAnswers", []) for p in profiles],
+        )
+        shared_interests = cls.shared_interests_batch(
+            user_profile.get("interests", []),
+            [p.get("interests", []) for p in profiles],
+        )
+
+        now = now or datetime.now(timezone.utc)
+        num_profiles = len(profiles)
+        epoch_seconds = AdvancedScoringService.epoch_seconds
+        targets = {
+            "hoursSinceActivity": AdvancedScoringService.hours_since_activities(
+                np.fromiter(
+                    (epoch_seconds(p.get("lastActiveAt")) for p in profiles), float, num_profiles
+                ),
+                np.fromiter(
+                    (epoch_seconds(p.get("lastLoginAt")) for p in profiles), float, num_profiles
+                ),
+                now.timestamp(),
+            ),
+            "messagesSent": np.fromiter(
+                (p.get("messagesSent", 0) for p in profiles), np.int64, num_profiles
+            ),
+            "messagesReceived": np.fromiter(
+                (p.get("messagesReceived", 0) for p in profiles), np.int64, num_profiles
+            ),
+            "matchesCount": np.fromiter(
+                (p.get("matchesCount", 0) for p in profiles), np.int64, num_profiles
+            ),
+            "mutualInterests": np.fromiter(
+                (len(shared) for shared in shared_interests), np.int64, num_profiles
+            ),
+            "dealbreakerAlignment": cls._calculate_dealbreaker_alignments(
+                user_profile, profiles
+            ),
+        }
+        personality = np.fromiter(
+            (r["personalityScore"] for r in personality_results), float, num_profiles
+        )
+        scores = AdvancedScoringService.calculate_advanced_score_batch(
+            user_data=user_profile,
+            targets=targets,
+            personality_compatibility=personality,
+            now=now,
+        )
+
+        scoring_weights = {
+            "personalityWeight": cls.V1_WEIGHT,
+            "advancedWeight": cls.V2_WEIGHT,
+        }
+        user_activity = round(scores["userActivity"], 3)
+        user_response = round(scores["userResponseRate"], 3)
+        results = []
+        for (
+            personality_result,
+            shared,
+            activity_score,
+            response_score,
+            reciprocity_score,
+            advanced_score,
+            target_activity_score,
+            target_response_score,
+        ) in zip(
+            personality_results,
+            shared_interests,
+            scores["activityScore"].tolist(),
+            scores["responseRateScore"].tolist(),
+            scores["reciprocityScore"].tolist(),
+            scores["advancedScore"].tolist(),
+            scores["targetActivity"].tolist(),
+            scores["targetResponseRate"].tolist(),
+        ):
+            final_score = (
+                personality_result["personalityScore"] * cls.V1_WEIGHT
+                + round(advanced_score, 3) * cls.V2_WEIGHT
+            )
+            results.append({
+                "compatibilityScore": round(final_score * 100, 1),
+                "version": "v2",
+                "details": {
+                    "communication": personality_result["communication"],
+                    "values": personality_result["values"],
+                    "lifestyle": personality_result["lifestyle"],
+                    "personality": personality_result["personality"],
+                },
+                "advancedFactors": {
+                    "activityScore": round(activity_score, 3),
+                    "responseRateScore": round(response_score, 3),
+                    "reciprocityScore": round(reciprocity_score, 3),
+                    "details": {
+                        "userActivity": user_activity,
+                        "targetActivity": round(target_activity_score, 3),
+                        "userResponseRate": user_response,
+                        "targetResponseRate": round(target_response_score, 3),
+                    },
+                },
+                "sharedInterests": shared,
+                "scoringWeights": dict(scoring_weights),
+            })
+
+        return results
+
     @staticmethod
+    def _approximate_distance_km(
+        user1_profile: Dict,
+        user2_profile: Dict,
+    ) -> Optional[float]:
+        """
+        Approximate distance between two users from their coordinates.
+
+        Simplified planar check (would use proper geo calculation in production).
+
+        Args:
+            user1_profile: Profile of user 1
+            user2_profile: Profile of user 2
+
+        Returns:
+            Distance in kilometers, or None if location data is missing
+        """
+        user1_lat = user1_profile.get("latitude")
+        user1_lon = user1_profile.get("longitude")
+        user2_lat = user2_profile.get("latitude")
+        user2_lon = user2_profile.get("longitude")
+
+        if not all([user1_lat, user1_lon, user2_lat, user2_lon]):
+            return None
+
+        lat_diff = abs(user1_lat - user2_lat)
+        lon_diff = abs(user1_lon - user2_lon)
+        # Rough approximation: 1 degree ≈ 111km. math.sqrt is correctly
+        # rounded like np.sqrt, so batch distances are identical
+        return math.sqrt(lat_diff * lat_diff + lon_diff * lon_diff) * 111
+
+    @staticmethod
+    def _approximate_distances_km(
+        user_profile: Dict,
+        profiles: List[Dict],
+    ) -> np.ndarray:
+        """
+        Approximate distances between one user and many others.
+
+        Same approximation as _approximate_distance_km, computed for all
+        profiles at once.
+
+        Args:
+            user_profile: Profile of the base user
+            profiles: Profiles of the other users
+
+        Returns:
+            Distances in kilometers (NaN if location data is missing),
+            aligned with profiles
+        """
+        user_lat = user_profile.get("latitude")
+        user_lon = user_profile.get("longitude")
+        if not (user_lat and user_lon):
+            return np.full(len(profiles), np.nan)
+
+        # Missing and zero coordinates are both treated as missing, as in
+        # the pair version
+        num_profiles = len(profiles)
+        latitudes = np.fromiter(
+            (p.get("latitude") or np.nan for p in profiles), float, num_profiles
+        )
+        longitudes = np.fromiter(
+            (p.get("longitude") or np.nan for p in profiles), float, num_profiles
+        )
+        lat_diff = np.abs(user_lat - latitudes)
+        lon_diff = np.abs(user_lon - longitudes)
+        return np.sqrt(lat_diff * lat_diff + lon_diff * lon_diff) * 111
+
+    @staticmethod
+    def basic_compatibility_mask(
+        user_profile: Dict,
+        profiles: List[Dict],
+    ) -> np.ndarray:
+        """
+        Compute which profiles pass basic mutual criteria (age, gender, distance).
+
+        Candidate fields are laid out as arrays once and the admissibility
+        mask is computed for all candidates in a single expression. A check
+        is skipped when the data it needs is missing on either side.
+
+        Args:
+            user_profile: Profile of the user the selection is generated for
+            profiles: Candidate profiles
+
+        Returns:
+            Boolean array aligned with profiles
+        """
+        if not profiles:
+            return np.zeros(0, dtype=bool)
+
+        base = _profiles_to_soa([user_profile])
+        candidates = _profiles_to_soa(profiles)
+
+        def within(values, low, high):
+            missing = np.isnan(values) | np.isnan(low) | np.isnan(high)
+            return missing | ((values >= low) & (values <= high))
+
+        def gender_accepted(accepted, genders):
+            return (accepted == 0) | (genders == 0) | ((accepted & genders) != 0)
+
+        # Distance between the user and every candidate
+        lat_diff = np.abs(candidates["latitude"] - base["latitude"])
+        lon_diff = np.abs(candidates["longitude"] - base["longitude"])
+        distances = np.sqrt(lat_diff * lat_diff + lon_diff * lon_diff) * 111
+
+        return (
+            within(candidates["age"], base["min_age"], base["max_age"])
+            & within(base["age"], candidates["min_age"], candidates["max_age"])
+            & gender_accepted(base["accepted_genders"], candidates["gender"])
+            & gender_accepted(candidates["accepted_genders"], base["gender"])
+            & within(distances, 0.0, base["max_distance"])
+            & within(distances, 0.0, candidates["max_distance"])
+        )
+
+    @classmethod
+    def filter_basic_compatibility(
+        cls,
+        user_profile: Dict,
+        profiles: List[Dict],
+    ) -> List[Dict]:
+        """
+        Filter profiles on basic mutual criteria (age, gender, distance).
+
+        Args:
+            user_profile: Profile of the user the selection is generated for
+            profiles: Candidate profiles
+
+        Returns:
+            Profiles passing all checks, in their original order
+        """
+        mask = cls.basic_compatibility_mask(user_profile, profiles)
+        return [profile for profile, keep in zip(profiles, mask) if keep]
+
+    @classmethod
     def _calculate_dealbreaker_alignment(
+        cls,
         user1_profile: Dict,
         user2_profile: Dict,
+        distance_km: Optional[float] = None,
     ) -> float:
         """
         Calculate alignment on dealbreakers (preferences that must match).
@@ -310,6 +1010,8 @@ class CompatibilityCalculator:
         Args:
             user1_profile: Profile of user 1
             user2_profile: Profile of user 2
+            distance_km: Precomputed distance between the users (computed
+                from their coordinates if not provided)
             
         Returns:
             Alignment score between 0.0 and 1.0
@@ -331,21 +1033,14 @@ class CompatibilityCalculator:
                 alignment_score -= 0.3
 
         # Distance preference (if location data available)
-        user1_lat = user1_profile.get("latitude")
-        user1_lon = user1_profile.get("longitude")
-        user2_lat = user2_profile.get("latitude")
-        user2_lon = user2_profile.get("longitude")
         max_distance = preferences.get("maxDistance")
-
-        if all([user1_lat, user1_lon, user2_lat, user2_lon, max_distance]):
-            checks_performed += 1
-            # Simplified distance check (would use proper geo calculation in production)
-            lat_diff = abs(user1_lat - user2_lat)
-            lon_diff = abs(user1_lon - user2_lon)
-            # Rough approximation: 1 degree ≈ 111km
-            approx_distance = ((lat_diff ** 2 + lon_diff ** 2) ** 0.5) * 111
-            if approx_distance > max_distance:
-                alignment_score -= 0.2
+        if max_distance:
+            if distance_km is None:
+                distance_km = cls._approximate_distance_km(user1_profile, user2_profile)
+            if distance_km is not None:
+                checks_performed += 1
+                if distance_km > max_distance:
+                    alignment_score -= 0.2
 
         # Gender preference (if specified)
         preferred_gender = preferences.get("gender")
@@ -361,6 +1056,69 @@ class CompatibilityCalculator:
 
         return max(0.0, min(1.0, alignment_score))
 
+    @classmethod
+    def _calculate_dealbreaker_alignments(
+        cls,
+        user_profile: Dict,
+        profiles: List[Dict],
+    ) -> np.ndarray:
+        """
+        Calculate alignment of one user's dealbreakers with many profiles.
+
+        Applies the checks of _calculate_dealbreaker_alignment to all
+        profiles at once, with the same operations in the same order, so
+        alignments are identical.
+
+        Args:
+            user_profile: Profile of the user whose preferences are checked
+            profiles: Profiles checked against them
+
+        Returns:
+            Alignment scores between 0.0 and 1.0, aligned with profiles
+        """
+        num_profiles = len(profiles)
+        preferences = user_profile.get("preferences") or {}
+        alignment_scores = np.ones(num_profiles)
+        checks_performed = np.zeros(num_profiles, dtype=np.int64)
+
+        # Age preference (missing and zero ages are skipped)
+        ages = np.fromiter((p.get("age") or np.nan for p in profiles), float, num_profiles)
+        has_age = ~np.isnan(ages)
+        if has_age.any():
+            min_age = preferences.get("minAge", 18)
+            max_age = preferences.get("maxAge", 100)
+            checks_performed += has_age
+            outside = has_age & ~((min_age <= ages) & (ages <= max_age))
+            alignment_scores = np.where(outside, alignment_scores - 0.3, alignment_scores)
+
+        # Distance preference (if location data available)
+        max_distance = preferences.get("maxDistance")
+        if max_distance:
+            distances = cls._approximate_distances_km(user_profile, profiles)
+            has_distance = ~np.isnan(distances)
+            checks_performed += has_distance
+            too_far = has_distance & (distances > max_distance)
+            alignment_scores = np.where(too_far, alignment_scores - 0.2, alignment_scores)
+
+        # Gender preference (if specified)
+        preferred_gender = preferences.get("gender")
+        if preferred_gender:
+            genders = [p.get("gender") for p in profiles]
+            has_gender = np.fromiter((bool(g) for g in genders), bool, num_profiles)
+            checks_performed += has_gender
+            if preferred_gender != "any":
+                mismatch = has_gender & np.fromiter(
+                    (g != preferred_gender for g in genders), bool, num_profiles
+                )
+                alignment_scores = np.where(mismatch, alignment_scores - 0.4, alignment_scores)
+
+        # Neutral score where no checks were performed
+        return np.where(
+            checks_performed == 0,
+            0.7,
+            np.maximum(0.0, np.minimum(1.0, alignment_scores)),
+        )
+
     @staticmethod
     def generate_match_reasons(
         breakdown: Dict[str, float],
@@ -0,0 +1,342 @@
+"""
+Numerical kernels for batch compatibility scoring.
+
+Kernels are compiled with numba when it is installed and fall back to NumPy
+otherwise. Both implementations give identical results: fastmath is not
+enabled and sums are accumulated in answer order, as in the per-pair path.
+Similarities are computed and summed in float64 for the same reason: scores
+are rounded to three decimals, and float32 sums would move some of them.
+Large batches are split across cores, each candidate is still reduced
+sequentially by a single thread so results do not change.
+"""
+
+import logging
+import threading
+from typing import Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    from numba import njit, prange
+
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+# Batches with at least this many candidates use the multithreaded kernel
+# (0 disables it, e.g. in process pool workers that already use every core)
+PARALLEL_MIN_CANDIDATES = 5000
+
+# Numba's default threading layer does not support concurrent launches
+_parallel_lock = threading.Lock()
+
+
+def _score_answers_numpy(
+    present: np.ndarray,
+    numeric: np.ndarray,
+    boolean: np.ndarray,
+    choices_similarity: np.ndarray,
+    text_similarity: np.ndarray,
+    base_numeric: np.ndarray,
+    base_boolean: np.ndarray,
+    base_category: np.ndarray,
+    num_categories: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """NumPy implementation of score_answers."""
+    num_candidates = present.shape[0]
+
+    # Pick the similarity of the first answer type both users share
+    both_numeric = ~np.isnan(numeric) & ~np.isnan(base_numeric)
+    both_boolean = (boolean >= 0) & (base_boolean >= 0)
+    similarity = np.where(
+        both_numeric,
+        (10 - np.abs(numeric - base_numeric)) / 10,
+        np.where(
+            both_boolean,
+            (boolean == base_boolean).astype(np.float64),
+            np.where(
+                ~np.isnan(choices_similarity),
+                choices_similarity,
+                np.where(~np.isnan(text_similarity), text_similarity, 0.0),
+            ),
+        ),
+    )
+    similarity[~present] = 0.0
+
+    # Accumulate in answer order so sums match the per-pair calculation
+    common_questions = present.sum(axis=1)
+    total_scores = np.zeros(num_candidates)
+    if similarity.shape[1]:
+        total_scores = np.add.accumulate(similarity, axis=1)[:, -1]
+
+    category_sums = np.zeros((num_candidates, num_categories))
+    category_counts = np.zeros((num_candidates, num_categories), dtype=np.int64)
+    for idx in range(num_categories):
+        columns = np.flatnonzero(base_category == idx)
+        if columns.size:
+            category_sums[:, idx] = np.add.accumulate(
+                similarity[:, columns], axis=1
+            )[:, -1]
+            category_counts[:, idx] = present[:, columns].sum(axis=1)
+
+    return common_questions, total_scores, category_sums, category_counts
+
+
+def _score_answers_loop(
+    present: np.ndarray,
+    numeric: np.ndarray,
+    boolean: np.ndarray,
+    choices_similarity: np.ndarray,
+    text_similarity: np.ndarray,
+    base_numeric: np.ndarray,
+    base_boolean: np.ndarray,
+    base_category: np.ndarray,
+    num_categories: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Single-pass loop implementation of score_answers, compiled with numba."""
+    num_candidates, num_questions = present.shape
+    common_questions = np.zeros(num_candidates, dtype=np.int64)
+    total_scores = np.zeros(num_candidates)
+    category_sums = np.zeros((num_candidates, num_categories))
+    category_counts = np.zeros((num_candidates, num_categories), dtype=np.int64)
+
+    for i in prange(num_candidates):
+        total = 0.0
+        for j in range(num_questions):
+            if not present[i, j]:
+                continue
+
+            if not np.isnan(numeric[i, j]) and not np.isnan(base_numeric[j]):
+                similarity = (10 - abs(numeric[i, j] - base_numeric[j])) / 10
+            elif boolean[i, j] >= 0 and base_boolean[j] >= 0:
+                similarity = 1.0 if boolean[i, j] == base_boolean[j] else 0.0
+            elif not np.isnan(choices_similarity[i, j]):
+                similarity = choices_similarity[i, j]
+            elif not np.isnan(text_similarity[i, j]):
+                similarity = text_similarity[i, j]
+            else:
+                similarity = 0.0
+
+            total += similarity
+            common_questions[i] += 1
+            category = base_category[j]
+            if category >= 0:
+                category_sums[i, category] += similarity
+                category_counts[i, category] += 1
+
+        total_scores[i] = total
+
+    return common_questions, total_scores, category_sums, category_counts
+
+
+def _advanced_factors_loop(
+    hours_since_activity: np.ndarray,
+    messages_sent: np.ndarray,
+    messages_received: np.ndarray,
+    matches_count: np.ndarray,
+    mutual_interests: np.ndarray,
+    dealbreaker_alignment: np.ndarray,
+    personality: np.ndarray,
+    user_activity: float,
+    user_response: float,
+    activity_weight: float,
+    response_weight: float,
+    reciprocity_weight: float,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Single-pass loop over candidates of AdvancedScoringService factors, compiled with numba."""
+    num_candidates = hours_since_activity.shape[0]
+    target_activity = np.empty(num_candidates)
+    target_response = np.empty(num_candidates)
+    activity_scores = np.empty(num_candidates)
+    response_scores = np.empty(num_candidates)
+    reciprocity_scores = np.empty(num_candidates)
+    advanced_scores = np.empty(num_candidates)
+
+    for i in range(num_candidates):
+        hours = hours_since_activity[i]
+        if np.isnan(hours):
+            activity = 0.5
+        elif hours <= 24:
+            activity = 1.0 - (hours / 24) * 0.1
+        elif hours <= 72:
+            activity = 0.9 - ((hours - 24) / 48) * 0.2
+        elif hours <= 168:
+            activity = 0.7 - ((hours - 72) / 96) * 0.2
+        elif hours <= 720:
+            activity = 0.5 - ((hours - 168) / 552) * 0.2
+        else:
+            activity = max(0.0, 0.3 - ((hours - 720) / 720) * 0.3)
+
+        sent = messages_sent[i]
+        received = messages_received[i]
+        if matches_count[i] == 0:
+            response = 0.7
+        elif sent == 0 and received == 0:
+            response = 0.3
+        elif received == 0:
+            response = 0.5
+        elif sent == 0:
+            response = 0.2
+        else:
+            ratio = sent / received
+            if 0.7 <= ratio <= 1.5:
+                score = 1.0
+            elif ratio < 0.7:
+                score = max(0.2, ratio / 0.7)
+            else:
+                score = max(0.5, 1.0 - (ratio - 1.5) * 0.2)
+            response = min(1.0, score + (min(sent + received, 100) / 100) * 0.1)
+
+        interest = min(1.0, mutual_interests[i] / 5)
+        reciprocity = min(1.0, max(
+            0.0,
+            dealbreaker_alignment[i] * 0.40 + personality[i] * 0.35 + interest * 0.25,
+        ))
+        activity_score = (user_activity + activity) / 2
+        response_score = (user_response + response) / 2
+
+        target_activity[i] = activity
+        target_response[i] = response
+        activity_scores[i] = activity_score
+        response_scores[i] = response_score
+        reciprocity_scores[i] = reciprocity
+        advanced_scores[i] = (
+            activity_score * activity_weight
+            + response_score * response_weight
+            + reciprocity * reciprocity_weight
+        )
+
+    return (
+        target_activity,
+        target_response,
+        activity_scores,
+        response_scores,
+        reciprocity_scores,
+        advanced_scores,
+    )
+
+
+if NUMBA_AVAILABLE:
+    _score_answers = njit(cache=True)(_score_answers_loop)
+    _score_answers_parallel = njit(cache=True, parallel=True)(_score_answers_loop)
+    # Callers fall back to their NumPy expressions when this is None
+    advanced_factors = njit(cache=True)(_advanced_factors_loop)
+else:
+    _score_answers = _score_answers_numpy
+    _score_answers_parallel = None
+    advanced_factors = None
+
+
+def disable_parallel() -> None:
+    """Always use the single-threaded kernel in this process."""
+    global PARALLEL_MIN_CANDIDATES
+    PARALLEL_MIN_CANDIDATES = 0
+
+
+def score_answers(
+    present: np.ndarray,
+    numeric: np.ndarray,
+    boolean: np.ndarray,
+    choices_similarity: np.ndarray,
+    text_similarity: np.ndarray,
+    base_numeric: np.ndarray,
+    base_boolean: np.ndarray,
+    base_category: np.ndarray,
+    num_categories: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Reduce aligned (N, Q) answer arrays to per-candidate score sums.
+
+    For each cell the similarity of the first answer type both users share is
+    used (numeric, boolean, multiple choice, then text), matching
+    CompatibilityCalculator.calculate_personality_score.
+
+    Args:
+        present: Whether the candidate answered the base user's question
+        numeric: Candidate numeric answers (NaN if missing)
+        boolean: Candidate boolean answers (-1 if missing)
+        choices_similarity: Precomputed multiple choice similarity (NaN if missing)
+        text_similarity: Precomputed text similarity (NaN if missing)
+        base_numeric: Base user numeric answers (NaN if missing)
+        base_boolean: Base user boolean answers (-1 if missing)
+        base_category: Category index of each question (-1 if not reported)
+        num_categories: Number of reported categories
+
+    Returns:
+        Tuple of (common question counts, total similarity, category
+        similarity sums, category counts)
+    """
+    if (
+        _score_answers_parallel is not None
+        and 0 < PARALLEL_MIN_CANDIDATES <= present.shape[0]
+    ):
+        with _parallel_lock:
+            return _score_answers_parallel(
+                present,
+                numeric,
+                boolean,
+                choices_similarity,
+                text_similarity,
+                base_numeric,
+                base_boolean,
+                base_category,
+                num_categories,
+            )
+
+    return _score_answers(
+        present,
+        numeric,
+        boolean,
+        choices_similarity,
+        text_similarity,
+        base_numeric,
+        base_boolean,
+        base_category,
+        num_categories,
+    )
+
+
+def warm_up() -> None:
+    """Compile the kernels ahead of the first request (no-op without numba)."""
+    if not NUMBA_AVAILABLE:
+        return
+
+    base_numeric = np.full(1, np.nan)
+    base_boolean = np.full(1, -1, dtype=np.int8)
+    base_category = np.full(1, -1, dtype=np.int8)
+    # Base user columns are cached read-only, compile that signature
+    for array in (base_numeric, base_boolean, base_category):
+        array.flags.writeable = False
+
+    arrays = (
+        np.zeros((1, 1), dtype=bool),
+        np.full((1, 1), np.nan),
+        np.full((1, 1), -1, dtype=np.int8),
+        np.full((1, 1), np.nan),
+        np.full((1, 1), np.nan),
+        base_numeric,
+        base_boolean,
+        base_category,
+        1,
+    )
+    _score_answers(*arrays)
+    if PARALLEL_MIN_CANDIDATES > 0:
+        _score_answers_parallel(*arrays)
+    advanced_factors(
+        np.full(1, np.nan),
+        np.zeros(1, dtype=np.int64),
+        np.zeros(1, dtype=np.int64),
+        np.zeros(1, dtype=np.int64),
+        np.zeros(1, dtype=np.int64),
+        np.zeros(1),
+        np.zeros(1),
+        0.5,
+        0.5,
+        0.3,
+        0.4,
+        0.3,
+    )
+    logger.info("Numba scoring kernels compiled")
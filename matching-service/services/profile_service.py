@@ -3,17 +3,47 @@ Profile fetching service.
 
 This service provides functions to fetch user profiles from the database
 and convert them to the format expected by the compatibility calculator.
+Reads use Core selects returning plain rows, the service never writes so
+ORM instances and identity map bookkeeping are not needed.
 """
 
 import logging
+from datetime import date, datetime, time, timedelta
 from typing import List, Optional, Dict, Any
+from sqlalchemy import String, and_, cast, func, or_, select
 from sqlalchemy.orm import Session
 
-from models.database_models import User, Profile, PersonalityAnswer
+from models.database_models import GenderEnum, PersonalityAnswer, Profile, User
+from services.compatibility_calculator import normalize_gender
 
 logger = logging.getLogger(__name__)
 
 
+# Normalized genders stored as GenderEnum members (non_binary has none)
+_GENDER_MEMBERS = {
+    "man": GenderEnum.MALE,
+    "woman": GenderEnum.FEMALE,
+    "other": GenderEnum.OTHER,
+}
+
+# Columns read for each profile, fetched in a single joined select
+_PROFILE_COLUMNS = (
+    User.id,
+    User.lastActiveAt,
+    User.createdAt,
+    Profile.birthDate,
+    Profile.gender,
+    Profile.interests,
+    Profile.languages,
+    Profile.interestedInGenders,
+    Profile.minAge,
+    Profile.maxAge,
+    Profile.maxDistance,
+    Profile.latitude,
+    Profile.longitude,
+)
+
+
 def fetch_user_profile(db: Session, user_id: str) -> Optional[Dict[str, Any]]:
     """
     Fetch a complete user profile from the database.
@@ -26,59 +56,18 @@ def fetch_user_profile(db: Session, user_id: str) -> Optional[Dict[str, Any]]:
         User profile dictionary or None if not found
     """
     try:
-        # Fetch user with profile and personality answers
-        user = db.query(User).filter(User.id == user_id).first()
+        row = db.execute(
+            select(*_PROFILE_COLUMNS)
+            .join(Profile, Profile.userId == User.id)
+            .where(User.id == user_id)
+        ).mappings().first()
         
-        if not user or not user.profile:
+        if not row:
             logger.warning(f"User {user_id} not found or has no profile")
             return None
         
-        profile = user.profile
-        
-        # Convert personality answers to expected format
-        personality_answers = []
-        for answer in user.personality_answers:
-            answer_dict = {
-                "questionId": str(answer.questionId),
-                "category": answer.category or "personality",
-            }
-            
-            if answer.numericAnswer is not None:
-                answer_dict["numericAnswer"] = answer.numericAnswer
-            if answer.booleanAnswer is not None:
-                answer_dict["booleanAnswer"] = answer.booleanAnswer
-            if answer.multipleChoiceAnswer is not None:
-                answer_dict["multipleChoiceAnswer"] = answer.multipleChoiceAnswer
-            if answer.textAnswer is not None:
-                answer_dict["textAnswer"] = answer.textAnswer
-            
-            personality_answers.append(answer_dict)
-        
-        # Build profile dictionary
-        user_profile = {
-            "userId": str(user.id),
-            "age": _calculate_age(profile.birthDate) if profile.birthDate else None,
-            "gender": profile.gender.value if profile.gender else None,
-            "interests": profile.interests or [],
-            "languages": profile.languages or [],
-            "personalityAnswers": personality_answers,
-            "preferences": {
-                "minAge": profile.minAge,
-                "maxAge": profile.maxAge,
-                "gender": None,  # Would need to map from interestedInGenders
-                "maxDistance": profile.maxDistance,
-            },
-            "latitude": profile.latitude,
-            "longitude": profile.longitude,
-            "lastActiveAt": user.lastActiveAt.isoformat() if user.lastActiveAt else None,
-            "lastLoginAt": user.lastActiveAt.isoformat() if user.lastActiveAt else None,
-            "createdAt": user.createdAt.isoformat() if user.createdAt else None,
-            "messagesSent": 0,  # Would need to query messages table
-            "messagesReceived": 0,  # Would need to query messages table
-            "matchesCount": 0,  # Would need to query matches table
-        }
-        
-        return user_profile
+        answers = _fetch_personality_answers(db, [row["id"]])
+        return _build_profile(row, answers.get(row["id"], []))
         
     except Exception as e:
         logger.error(f"Error fetching user profile {user_id}: {str(e)}", exc_info=True)
@@ -90,49 +79,46 @@ def fetch_available_profiles(
     user_id: str,
     exclude_user_ids: List[str],
     limit: int = 100,
+    user_profile: Optional[Dict[str, Any]] = None,
 ) -> List[Dict[str, Any]]:
     """
     Fetch available profiles for matching, excluding specified users.
     
+    Profiles and their personality answers are read with one query each,
+    whatever the number of profiles. When the current user's profile is
+    given, profiles failing their basic criteria are left out by the query.
+    
     Args:
         db: Database session
         user_id: Current user's UUID
         exclude_user_ids: List of user UUIDs to exclude
         limit: Maximum number of profiles to return
+        user_profile: Current user's profile, as returned by fetch_user_profile
         
     Returns:
         List of user profile dictionaries
     """
     try:
-        # Fetch user's own profile first to apply filters
-        current_user_profile = fetch_user_profile(db, user_id)
-        if not current_user_profile:
-            logger.warning(f"Could not fetch current user profile: {user_id}")
-            return []
-        
         # Build exclude list (current user + explicitly excluded)
         all_exclude_ids = set(exclude_user_ids + [user_id])
         
         # Query for active profiles
-        # Note: In production, add more filters based on preferences
-        query = (
-            db.query(User)
-            .join(Profile)
-            .filter(
-                Profile.status == "active",
-                ~User.id.in_(all_exclude_ids),
-            )
-            .limit(limit)
-        )
+        conditions = [
+            Profile.status == "active",
+            ~User.id.in_(all_exclude_ids),
+        ]
+        if user_profile is not None:
+            conditions.extend(_basic_criteria_conditions(user_profile))
         
-        users = query.all()
+        rows = db.execute(
+            select(*_PROFILE_COLUMNS)
+            .join(Profile, Profile.userId == User.id)
+            .where(*conditions)
+            .limit(limit)
+        ).mappings().all()
         
-        # Convert to profile dictionaries
-        profiles = []
-        for user in users:
-            profile = fetch_user_profile(db, str(user.id))
-            if profile:
-                profiles.append(profile)
+        answers = _fetch_personality_answers(db, [row["id"] for row in rows])
+        profiles = [_build_profile(row, answers.get(row["id"], [])) for row in rows]
         
         logger.info(f"Fetched {len(profiles)} available profiles for user {user_id}")
         return profiles
@@ -142,12 +128,170 @@ def fetch_available_profiles(
         return []
 
 
+def _basic_criteria_conditions(user_profile: Dict[str, Any]) -> List[Any]:
+    """
+    Build query conditions for the user's basic criteria on candidates.
+    
+    Mirrors the checks of CompatibilityCalculator.basic_compatibility_mask
+    that can be written on candidate columns (age ranges both ways, the
+    user's accepted genders and distance), skipping them on missing values
+    the same way.
+    The mask still runs on fetched profiles, so conditions only need to
+    never reject a profile it would keep: distance uses the bounding box of
+    the distance check.
+    
+    Args:
+        user_profile: Current user's profile
+        
+    Returns:
+        SQLAlchemy conditions on Profile columns
+    """
+    conditions = []
+    preferences = user_profile.get("preferences") or {}
+    
+    # Candidate age within the user's range, as birth date bounds
+    min_age = preferences.get("minAge")
+    max_age = preferences.get("maxAge")
+    if min_age is not None and max_age is not None:
+        today = datetime.now().date()
+        try:
+            conditions.append(or_(
+                Profile.birthDate.is_(None),
+                and_(
+                    Profile.birthDate < _age_cutoff(today, min_age),
+                    Profile.birthDate >= _age_cutoff(today, max_age + 1),
+                ),
+            ))
+        except (OverflowError, ValueError):
+            pass  # Ages beyond the calendar range, leave the check to the mask
+    
+    # User's age within the candidate's range
+    age = user_profile.get("age")
+    if age is not None:
+        conditions.append(or_(
+            Profile.minAge.is_(None),
+            Profile.maxAge.is_(None),
+            and_(Profile.minAge <= age, Profile.maxAge >= age),
+        ))
+    
+    # Candidate gender among the accepted ones, in either vocabulary. Values
+    # without a GenderEnum member are left to the mask, an empty IN would
+    # drop every candidate
+    genders = list(preferences.get("interestedInGenders") or [])
+    genders.append(preferences.get("gender"))
+    members = {
+        _GENDER_MEMBERS[gender]
+        for gender in map(normalize_gender, genders)
+        if gender in _GENDER_MEMBERS
+    }
+    if members and "any" not in genders:
+        conditions.append(or_(
+            Profile.gender.is_(None),
+            Profile.gender.in_(sorted(members)),
+        ))
+    
+    # Candidate location within the distance box; the 1e-9 degree margin
+    # covers rounding differences with the exact check
+    latitude = user_profile.get("latitude")
+    longitude = user_profile.get("longitude")
+    max_distance = preferences.get("maxDistance")
+    if latitude is not None and longitude is not None and max_distance is not None:
+        degrees = max_distance / 111 + 1e-9
+        conditions.append(or_(
+            Profile.latitude.is_(None),
+            Profile.longitude.is_(None),
+            and_(
+                Profile.latitude.between(latitude - degrees, latitude + degrees),
+                Profile.longitude.between(longitude - degrees, longitude + degrees),
+            ),
+        ))
+    
+    return conditions
+
+
+def _age_cutoff(today: date, age: int) -> datetime:
+    """
+    Earliest birth date of people younger than age today.
+    
+    Matches _calculate_age: a person born on or after the cutoff is younger
+    than age, one born before it is at least age.
+    """
+    try:
+        birthday = today.replace(year=today.year - age)
+    except ValueError:
+        # February 29th in a non-leap year, born on the 28th is old enough
+        birthday = today.replace(year=today.year - age, day=28)
+    return datetime.combine(birthday + timedelta(days=1), time.min)
+
+
+def _fetch_personality_answers(db: Session, user_ids: List[Any]) -> Dict[Any, List[Dict[str, Any]]]:
+    """
+    Fetch the personality answers of several users in one query.
+    
+    Answers are aggregated into one JSON array per user by the database,
+    already in the calculator format (answer types that are NULL are left
+    out and the category defaults to personality), so one row per user is
+    returned and parsed in C instead of one row per answer in Python.
+    
+    Args:
+        db: Database session
+        user_ids: User UUIDs
+        
+    Returns:
+        Answers in the calculator format, keyed by user UUID
+    """
+    if not user_ids:
+        return {}
+    
+    answer = func.json_strip_nulls(func.json_build_object(
+        "questionId", cast(PersonalityAnswer.questionId, String),
+        "category", func.coalesce(PersonalityAnswer.category, "personality"),
+        "numericAnswer", PersonalityAnswer.numericAnswer,
+        "booleanAnswer", PersonalityAnswer.booleanAnswer,
+        "multipleChoiceAnswer", PersonalityAnswer.multipleChoiceAnswer,
+        "textAnswer", PersonalityAnswer.textAnswer,
+    ))
+    rows = db.execute(
+        select(PersonalityAnswer.userId, func.json_agg(answer).label("answers"))
+        .where(PersonalityAnswer.userId.in_(user_ids))
+        .group_by(PersonalityAnswer.userId)
+    )
+    
+    return {user_id: answers for user_id, answers in rows}
+
+
+def _build_profile(row, personality_answers: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build the calculator profile dictionary from a profile row."""
+    return {
+        "userId": str(row["id"]),
+        "age": _calculate_age(row["birthDate"]) if row["birthDate"] else None,
+        "gender": row["gender"].value if row["gender"] else None,
+        "interests": row["interests"] or [],
+        "languages": row["languages"] or [],
+        "personalityAnswers": personality_answers,
+        "preferences": {
+            "minAge": row["minAge"],
+            "maxAge": row["maxAge"],
+            "gender": None,
+            "interestedInGenders": row["interestedInGenders"] or [],
+            "maxDistance": row["maxDistance"],
+        },
+        "latitude": row["latitude"],
+        "longitude": row["longitude"],
+        "lastActiveAt": row["lastActiveAt"].isoformat() if row["lastActiveAt"] else None,
+        "lastLoginAt": row["lastActiveAt"].isoformat() if row["lastActiveAt"] else None,
+        "createdAt": row["createdAt"].isoformat() if row["createdAt"] else None,
+        "messagesSent": 0,  # Would need to query messages table
+        "messagesReceived": 0,  # Would need to query messages table
+        "matchesCount": 0,  # Would need to query matches table
+    }
+
+
 def _calculate_age(birth_date) -> Optional[int]:
     """Calculate age from birth date."""
     if not birth_date:
         return None
     
-    from datetime import datetime
     today = datetime.now()
     age = today.year - birth_date.year
     
@@ -0,0 +1,99 @@
+"""
+Algorithm statistics tracking.
+
+Counters are updated in process on every calculation and pushed to the
+shared Redis counters in batches, so requests never wait on Redis.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from .cache import CacheService
+
+logger = logging.getLogger(__name__)
+
+
+class StatsTracker:
+    """Thread-safe calculation counters with deferred Redis updates."""
+
+    def __init__(self, cache: CacheService):
+        """
+        Initialize stats tracker.
+
+        Args:
+            cache: Cache service holding the counters shared across workers
+        """
+        self.cache = cache
+        self._lock = threading.Lock()
+        self._totals = [0, 0, 0.0]
+        self._pending = [0, 0, 0.0]
+        self._last_update = time.time()
+
+    def record(self, scores: List[float], v2: bool = False) -> None:
+        """
+        Record compatibility calculations.
+
+        Args:
+            scores: Compatibility scores of the calculations
+            v2: Whether the calculations used the V2 algorithm
+        """
+        count = len(scores)
+        score_sum = sum(scores)
+        with self._lock:
+            for counters in (self._totals, self._pending):
+                counters[0] += count
+                if v2:
+                    counters[1] += count
+                counters[2] += score_sum
+            self._last_update = time.time()
+
+    def flush(self) -> bool:
+        """
+        Push calculations recorded since the last flush to Redis.
+
+        Returns:
+            True if the shared counters are up to date, False otherwise
+        """
+        with self._lock:
+            calculations, v2_calculations, score_sum = self._pending
+            last_update = self._last_update
+            self._pending = [0, 0, 0.0]
+
+        if not calculations:
+            return True
+
+        if self.cache.increment_stats(
+            calculations=calculations,
+            score_sum=score_sum,
+            v2_calculations=v2_calculations,
+            last_update=datetime.fromtimestamp(last_update).isoformat(),
+        ):
+            return True
+
+        # Keep the calculations for the next flush
+        with self._lock:
+            self._pending[0] += calculations
+            self._pending[1] += v2_calculations
+            self._pending[2] += score_sum
+        return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get the statistics of this process.
+
+        Returns:
+            Statistics dictionary in the same format as CacheService.get_stats
+        """
+        with self._lock:
+            total_calculations, total_v2_calculations, total_score = self._totals
+            last_update = self._last_update
+
+        return {
+            "total_calculations": total_calculations,
+            "total_v2_calculations": total_v2_calculations,
+            "total_score": total_score,
+            "last_update": datetime.fromtimestamp(last_update).isoformat(),
+        }
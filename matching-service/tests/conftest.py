@@ -0,0 +1,15 @@
+"""
+Shared pytest fixtures.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+
+
+@pytest.fixture(scope="session")
+def client():
+    """API client running the app lifespan once for the whole session."""
+    with TestClient(app) as test_client:
+        yield test_client
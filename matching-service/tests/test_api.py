@@ -4,18 +4,20 @@ Integration tests for the matching service API endpoints.
 
 import pytest
 from datetime import datetime, timedelta, timezone
-from fastapi.testclient import TestClient
-from main import app
+from services.compatibility_calculator import CompatibilityCalculator
 
 
-client = TestClient(app)
 API_KEY = "matching-service-secret-key"
+PAIR_REQUEST = {
+    "user1Profile": {"userId": "user1", "personalityAnswers": []},
+    "user2Profile": {"userId": "user2", "personalityAnswers": []},
+}
 
 
 class TestHealthEndpoint:
     """Test suite for health check endpoint."""
 
-    def test_health_check_success(self):
+    def test_health_check_success(self, client):
         """Health check should return 200 OK."""
         response = client.get("/health")
         
@@ -29,7 +31,7 @@ class TestHealthEndpoint:
 class TestCalculateCompatibilityV1:
     """Test suite for V1 compatibility endpoint."""
 
-    def test_calculate_compatibility_v1_success(self):
+    def test_calculate_compatibility_v1_success(self, client):
         """V1 compatibility calculation should succeed with valid data."""
         now = datetime.now(timezone.utc)
         request_data = {
@@ -65,52 +67,60 @@ class TestCalculateCompatibilityV1:
         assert 0 <= data["compatibilityScore"] <= 100
         assert "reading" in data["sharedInterests"]
 
-    def test_calculate_compatibility_v1_no_api_key(self):
-        """V1 endpoint should reject requests without API key."""
+    def test_calculate_compatibility_v1_ignores_unknown_fields(self, client):
+        """Fields the service does not use should not be rejected."""
         request_data = {
             "user1Profile": {
                 "userId": "user1",
-                "personalityAnswers": [],
+                "bio": "Hello",
+                "personalityAnswers": [{"questionId": "q1", "answer": 7, "numericAnswer": 7}],
+                "preferences": {"ageMin": 25},
             },
             "user2Profile": {
                 "userId": "user2",
-                "personalityAnswers": [],
+                "personalityAnswers": [{"questionId": "q1", "numericAnswer": 7}],
             },
         }
-        
+
         response = client.post(
             "/api/v1/matching-service/calculate-compatibility",
             json=request_data,
+            headers={"X-API-Key": API_KEY},
         )
-        
-        assert response.status_code == 422  # Missing required header
 
-    def test_calculate_compatibility_v1_invalid_api_key(self):
-        """V1 endpoint should reject invalid API key."""
-        request_data = {
-            "user1Profile": {
-                "userId": "user1",
-                "personalityAnswers": [],
-            },
-            "user2Profile": {
-                "userId": "user2",
-                "personalityAnswers": [],
-            },
+        assert response.status_code == 200
+        assert response.json()["compatibilityScore"] == 100.0
+
+    def test_calculate_compatibility_v1_breakdown_follows_user_order(self, client):
+        """A cached pair should not be served to the reverse pair."""
+        user_a = {
+            "userId": "breakdown_a",
+            "personalityAnswers": [{"questionId": "q1", "category": "values", "numericAnswer": 8}],
         }
-        
-        response = client.post(
-            "/api/v1/matching-service/calculate-compatibility",
-            json=request_data,
-            headers={"X-API-Key": "invalid-key"},
+        user_b = {
+            "userId": "breakdown_b",
+            "personalityAnswers": [
+                {"questionId": "q1", "category": "personality", "numericAnswer": 8}
+            ],
+        }
+
+        forward, reverse = (
+            client.post(
+                "/api/v1/matching-service/calculate-compatibility",
+                json={"user1Profile": user1, "user2Profile": user2},
+                headers={"X-API-Key": API_KEY},
+            ).json()
+            for user1, user2 in ((user_a, user_b), (user_b, user_a))
         )
-        
-        assert response.status_code == 401
+
+        assert forward["details"]["values"] == reverse["details"]["personality"] == 1.0
+        assert forward["details"]["personality"] == reverse["details"]["values"] == 0.5
 
 
 class TestCalculateCompatibilityV2:
     """Test suite for V2 compatibility endpoint."""
 
-    def test_calculate_compatibility_v2_success(self):
+    def test_calculate_compatibility_v2_success(self, client):
         """V2 compatibility calculation should succeed with valid data."""
         now = datetime.now(timezone.utc)
         request_data = {
@@ -160,7 +170,7 @@ class TestCalculateCompatibilityV2:
         assert "scoringWeights" in data
         assert 0 <= data["compatibilityScore"] <= 100
 
-    def test_calculate_compatibility_v2_has_advanced_factors(self):
+    def test_calculate_compatibility_v2_has_advanced_factors(self, client):
         """V2 response should include all advanced factors."""
         now = datetime.now(timezone.utc)
         request_data = {
@@ -200,52 +210,55 @@ class TestCalculateCompatibilityV2:
         assert "reciprocityScore" in factors
         assert "details" in factors
 
-    def test_calculate_compatibility_v2_no_api_key(self):
-        """V2 endpoint should reject requests without API key."""
-        request_data = {
-            "user1Profile": {
-                "userId": "user1",
-                "personalityAnswers": [],
-            },
-            "user2Profile": {
-                "userId": "user2",
-                "personalityAnswers": [],
-            },
-        }
-        
-        response = client.post(
-            "/api/v1/matching/calculate-compatibility-v2",
-            json=request_data,
-        )
-        
-        assert response.status_code == 422  # Missing required header
+class TestBatchCompatibilityV2:
+    """Test suite for batch V2 compatibility endpoint."""
 
-    def test_calculate_compatibility_v2_invalid_api_key(self):
-        """V2 endpoint should reject invalid API key."""
-        request_data = {
-            "user1Profile": {
-                "userId": "user1",
-                "personalityAnswers": [],
-            },
-            "user2Profile": {
-                "userId": "user2",
-                "personalityAnswers": [],
-            },
+    def test_batch_compatibility_v2_matches_pair_endpoint(self, client):
+        """Batch V2 results should match the V2 endpoint for each profile."""
+        base_profile = {
+            "userId": "v2-base",
+            "personalityAnswers": [
+                {"questionId": "q1", "numericAnswer": 7, "category": "values"}
+            ],
+            "interests": ["hiking", "reading"],
+            "messagesSent": 50,
+            "messagesReceived": 50,
+            "matchesCount": 5,
         }
-        
+        profiles = [
+            {
+                "userId": f"v2-user{i}",
+                "personalityAnswers": [
+                    {"questionId": "q1", "numericAnswer": 4 + i, "category": "values"}
+                ],
+                "interests": ["reading"] if i % 2 else ["travel"],
+                "messagesSent": 10 * i,
+                "messagesReceived": 20,
+                "matchesCount": i,
+            }
+            for i in range(3)
+        ]
+
         response = client.post(
-            "/api/v1/matching/calculate-compatibility-v2",
-            json=request_data,
-            headers={"X-API-Key": "invalid-key"},
+            "/api/v1/matching/batch-compatibility-v2",
+            json={"baseProfile": base_profile, "profilesToCompare": profiles},
+            headers={"X-API-Key": API_KEY},
         )
-        
-        assert response.status_code == 401
 
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert set(results) == {profile["userId"] for profile in profiles}
+        for profile in profiles:
+            expected = CompatibilityCalculator.calculate_compatibility_v2(
+                user1_profile=base_profile,
+                user2_profile=profile,
+            )
+            assert results[profile["userId"]] == expected
 
 class TestBatchCompatibility:
     """Test suite for batch compatibility endpoint."""
 
-    def test_batch_compatibility_success(self):
+    def test_batch_compatibility_success(self, client):
         """Batch compatibility should calculate for multiple profiles."""
         request_data = {
             "baseProfile": {
@@ -285,11 +298,154 @@ class TestBatchCompatibility:
         assert "user2" in data["results"]
         assert "user3" in data["results"]
 
+    def test_batch_compatibility_process_pool(self, client, monkeypatch):
+        """Batches scored in the process pool should match threadpool results."""
+        import main
+
+        profiles = [
+            {
+                "userId": f"pool-user{i}",
+                "personalityAnswers": [
+                    {"questionId": "q1", "numericAnswer": i % 10 + 1, "category": "values"},
+                    {"questionId": "q2", "booleanAnswer": i % 2 == 0, "category": "lifestyle"},
+                ],
+                "interests": ["hiking"] if i % 3 == 0 else ["gaming"],
+            }
+            for i in range(7)
+        ]
+        base_profile = {
+            "userId": "pool-base",
+            "personalityAnswers": [
+                {"questionId": "q1", "numericAnswer": 5, "category": "values"},
+                {"questionId": "q2", "booleanAnswer": True, "category": "lifestyle"},
+            ],
+            "interests": ["hiking"],
+        }
+        expected = CompatibilityCalculator.calculate_compatibility_v1_batch(
+            user_profile=base_profile,
+            profiles=profiles,
+        )
+
+        main.local_cache.clear()
+        monkeypatch.setattr(main, "PROCESS_POOL_WORKERS", 2)
+        monkeypatch.setattr(main, "PROCESS_POOL_MIN_PROFILES", 1)
+        response = client.post(
+            "/api/v1/matching-service/batch-compatibility",
+            json={"baseProfile": base_profile, "profilesToCompare": profiles},
+            headers={"X-API-Key": API_KEY},
+        )
+
+        assert response.status_code == 200
+        results = response.json()["results"]
+        for profile, result in zip(profiles, expected):
+            assert results[profile["userId"]] == result
+
+    def test_batch_v2_process_pool_matches_pairwise(self, client, monkeypatch):
+        """V2 batches scored in the process pool should match the pair endpoint."""
+        import main
+
+        profiles = [
+            {
+                "userId": f"pool-v2-user{i}",
+                "age": 25 + i,
+                "personalityAnswers": [
+                    {"questionId": "q1", "numericAnswer": i % 10 + 1, "category": "values"},
+                ],
+                "interests": ["hiking"] if i % 3 == 0 else ["gaming"],
+                "messagesSent": 10 * i,
+                "messagesReceived": 12,
+                "matchesCount": i % 4,
+            }
+            for i in range(7)
+        ]
+        base_profile = {
+            "userId": "pool-v2-base",
+            "personalityAnswers": [
+                {"questionId": "q1", "numericAnswer": 5, "category": "values"},
+            ],
+            "interests": ["hiking"],
+            "preferences": {"minAge": 26, "maxAge": 30},
+        }
+        expected = [
+            CompatibilityCalculator.calculate_compatibility_v2(
+                user1_profile=base_profile,
+                user2_profile=profile,
+            )
+            for profile in profiles
+        ]
+
+        monkeypatch.setattr(main, "PROCESS_POOL_WORKERS", 2)
+        monkeypatch.setattr(main, "PROCESS_POOL_MIN_PROFILES", 1)
+        response = client.post(
+            "/api/v1/matching/batch-compatibility-v2",
+            json={"baseProfile": base_profile, "profilesToCompare": profiles},
+            headers={"X-API-Key": API_KEY},
+        )
+
+        assert response.status_code == 200
+        results = response.json()["results"]
+        for profile, result in zip(profiles, expected):
+            assert results[profile["userId"]] == result
+
+    def test_naive_timestamps_treated_as_utc(self):
+        """Profile timestamps without a timezone should be normalized to UTC."""
+        from models.schemas import UserProfile
+
+        profile = UserProfile(
+            userId="naive",
+            lastActiveAt="2024-01-09T12:00:00",
+            createdAt="2024-01-01T00:00:00+02:00",
+        )
+
+        assert profile.lastActiveAt == datetime(2024, 1, 9, 12, tzinfo=timezone.utc)
+        assert profile.createdAt == datetime(2023, 12, 31, 22, tzinfo=timezone.utc)
+
+    def test_profile_view_matches_full_dump(self):
+        """Profile views should match and score like fully dumped profiles."""
+        from main import profile_view
+        from models.schemas import UserProfile
+
+        base = UserProfile(
+            userId="view-base",
+            personalityAnswers=[
+                {"questionId": "q1", "numericAnswer": 4, "category": "values"},
+                {"questionId": "q2", "multipleChoiceAnswer": ["a", "b"], "category": None},
+                {"questionId": "q3", "textAnswer": "Adventure"},
+            ],
+            interests=["hiking", "reading"],
+            preferences={"minAge": 25, "maxAge": 35},
+        )
+        other = UserProfile(
+            userId="view-other",
+            personalityAnswers=[
+                {"questionId": "q1", "numericAnswer": 9, "category": "values"},
+                {"questionId": "q2", "multipleChoiceAnswer": ["b"]},
+                {"questionId": "q3", "textAnswer": "adventure"},
+            ],
+            interests=["reading"],
+        )
+        assert profile_view(base) == base.model_dump()
+
+        expected = CompatibilityCalculator.calculate_compatibility_v1_batch(
+            user_profile=base.model_dump(),
+            profiles=[other.model_dump()],
+        )
+        actual = CompatibilityCalculator.calculate_compatibility_v1_batch(
+            user_profile=profile_view(base),
+            profiles=[profile_view(other)],
+        )
+
+        assert actual == expected
+        assert CompatibilityCalculator.calculate_compatibility_v1(
+            user1_profile=profile_view(base),
+            user2_profile=profile_view(other),
+        ) == expected[0]
+
 
 class TestDailySelection:
     """Test suite for daily selection endpoint."""
 
-    def test_generate_daily_selection_success(self):
+    def test_generate_daily_selection_success(self, client):
         """Daily selection should generate top matches."""
         request_data = {
             "userId": "user1",
@@ -338,11 +494,44 @@ class TestDailySelection:
         assert "scores" in data
         assert len(data["selectedProfiles"]) == 2
 
+    def test_generate_daily_selection_top_scores_in_order(self, client):
+        """Daily selection should return the best scores first, ties in input order."""
+        def profile(user_id, answer):
+            return {
+                "userId": user_id,
+                "personalityAnswers": [
+                    {"questionId": "q1", "numericAnswer": answer, "category": "values"}
+                ],
+            }
+
+        request_data = {
+            "userId": "user1",
+            "userProfile": profile("user1", 7),
+            "availableProfiles": [
+                profile("user2", 8),
+                profile("user3", 6),
+                profile("user4", 2),
+                profile("user5", 7),
+            ],
+            "selectionSize": 3,
+        }
+
+        response = client.post(
+            "/api/v1/matching-service/generate-daily-selection",
+            json=request_data,
+            headers={"X-API-Key": API_KEY},
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["selectedProfiles"] == ["user5", "user2", "user3"]
+        assert len(data["scores"]) == 4
+
 
 class TestAlgorithmStats:
     """Test suite for algorithm stats endpoint."""
 
-    def test_get_algorithm_stats_success(self):
+    def test_get_algorithm_stats_success(self, client):
         """Algorithm stats should return metrics."""
         response = client.get(
             "/api/v1/matching-service/algorithm/stats",
@@ -354,29 +543,15 @@ class TestAlgorithmStats:
         assert "totalCalculations" in data
         assert "averageScore" in data
         assert "lastUpdate" in data
+        assert 0.0 <= data["localCacheHitRate"] <= 1.0
         assert data["status"] == "online"
         assert data["version"] == "v2"
 
-    def test_get_algorithm_stats_no_api_key(self):
-        """Stats endpoint should reject requests without API key."""
-        response = client.get("/api/v1/matching-service/algorithm/stats")
-        
-        assert response.status_code == 422
-
-    def test_get_algorithm_stats_invalid_api_key(self):
-        """Stats endpoint should reject invalid API key."""
-        response = client.get(
-            "/api/v1/matching-service/algorithm/stats",
-            headers={"X-API-Key": "invalid-key"},
-        )
-        
-        assert response.status_code == 401
-
 
 class TestRecommendations:
     """Test suite for recommendations endpoint."""
 
-    def test_get_recommendations_success(self):
+    def test_get_recommendations_success(self, client):
         """Recommendations endpoint should return user-specific recommendations."""
         user_id = "test-user-123"
         response = client.get(
@@ -394,17 +569,47 @@ class TestRecommendations:
         assert isinstance(data["recommendations"], list)
         assert isinstance(data["totalAvailable"], int)
 
-    def test_get_recommendations_no_api_key(self):
-        """Recommendations endpoint should reject requests without API key."""
-        response = client.get("/api/v1/matching/recommendations/test-user-123")
-        
-        assert response.status_code == 422
 
-    def test_get_recommendations_invalid_api_key(self):
-        """Recommendations endpoint should reject invalid API key."""
-        response = client.get(
-            "/api/v1/matching/recommendations/test-user-123",
-            headers={"X-API-Key": "invalid-key"},
-        )
+class TestApiKey:
+    """Test suite for API key checks shared by all endpoints."""
+
+    @pytest.mark.parametrize(
+        "method, url, request_data",
+        [
+            ("POST", "/api/v1/matching-service/calculate-compatibility", PAIR_REQUEST),
+            ("POST", "/api/v1/matching/calculate-compatibility-v2", PAIR_REQUEST),
+            (
+                "POST",
+                "/api/v1/matching/batch-compatibility-v2",
+                {"baseProfile": {"userId": "user1"}, "profilesToCompare": []},
+            ),
+            ("GET", "/api/v1/matching-service/algorithm/stats", None),
+            ("GET", "/api/v1/matching/recommendations/test-user-123", None),
+        ],
+    )
+    @pytest.mark.parametrize(
+        "headers, status_code",
+        [
+            ({}, 422),  # Missing required header
+            ({"X-API-Key": "invalid-key"}, 401),
+        ],
+    )
+    def test_rejects_missing_or_invalid_api_key(
+        self, client, method, url, request_data, headers, status_code
+    ):
+        """Endpoints should reject requests without a valid API key."""
+        response = client.request(method, url, json=request_data, headers=headers)
+        
+        assert response.status_code == status_code
+
+    def test_rejected_api_key_not_logged(self, client, caplog):
+        """Rejected keys should be logged without their value."""
+        with caplog.at_level("WARNING"):
+            response = client.get(
+                "/api/v1/matching-service/algorithm/stats",
+                headers={"X-API-Key": "rotated-secret-key"},
+            )
         
         assert response.status_code == 401
+        assert "Invalid API key attempt" in caplog.text
+        assert "rotated-secret-key" not in caplog.text
@@ -2,8 +2,19 @@
 Unit tests for the cache service.
 """
 
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
 import pytest
-from services.cache import CacheService
+from services.cache import (
+    COMPRESS_MIN_BYTES,
+    CacheService,
+    LocalCache,
+    _decode,
+    _encode,
+    _payload,
+)
 
 
 class TestCacheService:
@@ -63,17 +74,77 @@ class TestCacheService:
         
         assert result is False
 
-    def test_make_key_sorts_user_ids(self):
-        """Cache keys should be consistent regardless of user ID order."""
+    def test_get_many_returns_misses_when_disabled(self):
+        """get_many() should return one None per user when cache is disabled."""
+        cache = CacheService(enabled=False)
+        
+        result = cache.get_many("user1", ["user2", "user3"])
+        
+        assert result == [None, None]
+
+    def test_set_many_returns_false_when_disabled(self):
+        """set_many() should return False when cache is disabled."""
+        cache = CacheService(enabled=False)
+        
+        result = cache.set_many("user1", {"user2": {"score": 85.0}})
+        
+        assert result is False
+
+    def test_increment_stats_returns_false_when_disabled(self):
+        """increment_stats() should return False when cache is disabled."""
+        cache = CacheService(enabled=False)
+        
+        result = cache.increment_stats(calculations=1, score_sum=85.0)
+        
+        assert result is False
+
+    def test_get_stats_returns_none_when_disabled(self):
+        """get_stats() should return None when cache is disabled."""
+        cache = CacheService(enabled=False)
+        
+        result = cache.get_stats()
+        
+        assert result is None
+
+    @pytest.mark.parametrize("version", ["v1", "v2"])
+    def test_make_key_keeps_user_order(self, version):
+        """Results are directional, so keys should keep the user order."""
+        cache = CacheService(enabled=False)
+        
+        key1 = cache._make_key("user1", "user2", version)
+        key2 = cache._make_key("user2", "user1", version)
+        
+        assert key1 != key2
+        assert key1.startswith(b"c:" + version.encode() + b":")
+
+    def test_make_key_fixed_size(self):
+        """Cache keys should be short digests whatever the user ID length."""
         cache = CacheService(enabled=False)
         
-        key1 = cache._make_key("user1", "user2", "v1")
-        key2 = cache._make_key("user2", "user1", "v1")
+        short_key = cache._make_key("a", "b", "v1")
+        long_key = cache._make_key(
+            "9f1c2b3a-1111-2222-3333-444455556666",
+            "0a1c2b3a-1111-2222-3333-444455556666",
+            "v1",
+        )
         
-        assert key1 == key2
-        assert "user1" in key1
-        assert "user2" in key1
-        assert "v1" in key1
+        assert short_key != long_key
+        assert len(short_key) == len(long_key) == len(b"c:v1:") + 16
+
+    def test_make_key_includes_fingerprints(self):
+        """Cache keys should change with the profiles of both users."""
+        cache = CacheService(enabled=False)
+        digest1 = CacheService.fingerprint_digest(
+            ((("q1", 8, None, (), None, "personality"),), ("hiking",))
+        )
+        digest2 = CacheService.fingerprint_digest(((), ()))
+        
+        key = cache._make_key("user1", "user2", "v1", (digest1, digest2))
+        
+        assert key != cache._make_key("user1", "user2", "v1")
+        assert key != cache._make_key("user1", "user2", "v1", (digest2, digest1))
+        assert key == cache._make_key("user1", "user2", "v1", (digest1, digest2))
+        assert len(key) == len(b"c:v1:") + 16
 
     def test_make_key_includes_version(self):
         """Cache keys should include algorithm version."""
@@ -83,8 +154,141 @@ class TestCacheService:
         key_v2 = cache._make_key("user1", "user2", "v2")
         
         assert key_v1 != key_v2
-        assert "v1" in key_v1
-        assert "v2" in key_v2
+        assert b"v1" in key_v1
+        assert b"v2" in key_v2
+
+
+class TestPayloadEncoding:
+    """Test suite for cached payload encoding."""
+
+    def test_small_payload_stored_as_json(self):
+        """Payloads below the threshold should be stored as plain JSON."""
+        result = {"compatibilityScore": 85.5, "sharedInterests": ["reading"]}
+        
+        encoded = _encode(result)
+        
+        assert encoded == orjson.dumps(result)
+        assert _decode(encoded) == result
+        assert _payload(encoded) == encoded
+
+    def test_large_payload_compressed(self):
+        """Payloads above the threshold should round-trip compressed."""
+        result = {
+            "compatibilityScore": 62.2,
+            "version": "v2",
+            "details": {"communication": 0.5, "values": 0.55, "lifestyle": 0.5, "personality": 0.6},
+            "advancedFactors": {
+                "activityScore": 0.466,
+                "responseRateScore": 0.85,
+                "reciprocityScore": 0.748,
+                "details": {
+                    "userActivity": 0.5,
+                    "targetActivity": 0.432,
+                    "userResponseRate": 0.7,
+                    "targetResponseRate": 1.0,
+                },
+            },
+            "sharedInterests": ["hiking", "reading"],
+            "scoringWeights": {"personalityWeight": 0.6, "advancedWeight": 0.4},
+        }
+        assert len(orjson.dumps(result)) >= COMPRESS_MIN_BYTES
+        
+        encoded = _encode(result)
+        
+        assert len(encoded) < len(orjson.dumps(result)) / 3
+        assert _decode(encoded) == result
+        assert _payload(encoded) == orjson.dumps(result)
+
+    def test_corrupt_entries_decoded_as_misses(self):
+        """Corrupt, truncated or foreign entries should be treated as missing."""
+        encoded = _encode({"sharedInterests": ["reading"] * 50})
+        assert encoded[:1] == b"\x01"
+
+        assert _payload(b"\x01not deflate data") is None
+        assert _payload(encoded[:len(encoded) // 2]) is None
+        assert _decode(encoded[:len(encoded) // 2]) is None
+        assert _decode(b'{"compatibilityScore": ') is None
+
+
+class TestLocalCache:
+    """Test suite for LocalCache."""
+
+    def test_set_and_get(self):
+        """Cached values should be returned until they expire."""
+        cache = LocalCache(maxsize=10, ttl=60)
+
+        cache.set(("user1", "user2"), {"score": 85.0})
+
+        assert cache.get(("user1", "user2")) == {"score": 85.0}
+        assert cache.get(("user1", "user3")) is None
+
+    def test_expired_entries_are_dropped(self):
+        """Expired entries should be treated as missing."""
+        cache = LocalCache(maxsize=10, ttl=-1)
+
+        cache.set("key", {"score": 85.0})
+
+        assert cache.get("key") is None
+        assert len(cache) == 0
+
+    def test_least_recently_used_evicted(self):
+        """The least recently used entry should be evicted when full."""
+        cache = LocalCache(maxsize=2, ttl=60)
+
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_zero_maxsize_disables_cache(self):
+        """A cache with maxsize 0 should not store anything."""
+        cache = LocalCache(maxsize=0)
+
+        cache.set("key", 1)
+
+        assert cache.get("key") is None
+
+    def test_hit_rate(self):
+        """Hits and misses should be counted until the cache is cleared."""
+        cache = LocalCache(maxsize=10, ttl=60)
+
+        assert cache.hit_rate == 0.0
+        cache.set("key", 1)
+        cache.get("key")
+        cache.get("key")
+        cache.get("missing")
+
+        assert (cache.hits, cache.misses) == (2, 1)
+        assert cache.hit_rate == 2 / 3
+
+        cache.clear()
+        assert (cache.hits, cache.misses) == (0, 0)
+
+    def test_concurrent_access_from_threads(self):
+        """Threads evicting each other's entries should not break lookups."""
+
+        class YieldingKey(int):
+            def __hash__(self):
+                # Let other threads run in the middle of cache operations
+                time.sleep(0)
+                return int.__hash__(self)
+
+        cache = LocalCache(maxsize=4, ttl=60)
+
+        def work(seed):
+            for i in range(500):
+                key = YieldingKey((seed + i) % 8)
+                if cache.get(key) is None:
+                    cache.set(key, i)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(work, range(8)))
+
+        assert len(cache) == 4
 
 
 # Integration tests (require Redis to be running)
@@ -139,14 +343,92 @@ class TestCacheServiceIntegration:
             pytest.skip("Redis not available")
         
         test_result = {"compatibilityScore": 90.0}
+        fingerprints = (b"1" * 16, b"2" * 16)
         
-        cache.set("user1", "user2", test_result, version="v1")
-        assert cache.get("user1", "user2", version="v1") is not None
+        cache.set("user1", "user2", test_result, version="v1", fingerprints=fingerprints)
+        cache.set("user2", "user1", test_result, version="v1", fingerprints=fingerprints[::-1])
+        assert cache.get("user1", "user2", version="v1", fingerprints=fingerprints) is not None
         
         # Invalidate
-        success = cache.invalidate("user1", "user2", version="v1")
+        success = cache.invalidate("user1", "user2", version="v1", fingerprints=fingerprints)
         assert success is True
         
-        # Should no longer be in cache
-        result = cache.get("user1", "user2", version="v1")
-        assert result is None
+        # Should no longer be in cache, from either side
+        assert cache.get("user1", "user2", version="v1", fingerprints=fingerprints) is None
+        assert cache.get("user2", "user1", version="v1", fingerprints=fingerprints[::-1]) is None
+
+    def test_set_many_and_get_many_with_redis(self):
+        """Should store and retrieve many values in one round-trip each."""
+        cache = CacheService(host="localhost", port=6379)
+        
+        if not cache.enabled:
+            pytest.skip("Redis not available")
+        
+        cache.set_many(
+            "user1",
+            {"user2": {"compatibilityScore": 85.0}, "user3": {"compatibilityScore": 60.0}},
+            version="v1",
+        )
+        cache.invalidate("user1", "user4", version="v1")
+        
+        results = cache.get_many("user1", ["user3", "user4", "user2"], version="v1")
+        assert results[0]["compatibilityScore"] == 60.0
+        assert results[1] is None
+        assert results[2]["compatibilityScore"] == 85.0
+        # Shares keys with single pair lookups from the same side only
+        assert cache.get("user1", "user2", version="v1")["compatibilityScore"] == 85.0
+        assert cache.get("user2", "user1", version="v1") is None
+
+    def test_get_many_misses_changed_profiles_with_redis(self):
+        """Results cached with profile fingerprints should miss once a profile changes."""
+        cache = CacheService(host="localhost", port=6379)
+        
+        if not cache.enabled:
+            pytest.skip("Redis not available")
+        
+        before, after, other = b"b" * 16, b"a" * 16, b"o" * 16
+        cache.set_many(
+            "user1",
+            {"user2": {"compatibilityScore": 85.0}},
+            version="v1",
+            fingerprint=other,
+            other_fingerprints={"user2": before},
+        )
+        
+        assert cache.get("user1", "user2", version="v1", fingerprints=(other, before)) is not None
+        results = cache.get_many(
+            "user1", ["user2"], version="v1", fingerprint=other, other_fingerprints=[after]
+        )
+        assert results == [None]
+
+    def test_stats_round_trip_with_redis(self):
+        """Shared stats should be decoded from the raw Redis hash."""
+        cache = CacheService(host="localhost", port=6379)
+        
+        if not cache.enabled:
+            pytest.skip("Redis not available")
+        
+        before = cache.get_stats() or {"total_calculations": 0}
+        assert cache.increment_stats(calculations=2, score_sum=150.0, last_update="now")
+        
+        stats = cache.get_stats()
+        assert stats["total_calculations"] == before["total_calculations"] + 2
+        assert stats["last_update"] == "now"
+
+    def test_clear_user_cache_uses_user_index(self):
+        """Should clear exactly the entries involving the user."""
+        cache = CacheService(host="localhost", port=6379)
+        
+        if not cache.enabled:
+            pytest.skip("Redis not available")
+        
+        cache.clear_user_cache("user1")
+        cache.set("user1", "user2", {"compatibilityScore": 85.0}, version="v1")
+        cache.set_many("user3", {"user1": {"compatibilityScore": 60.0}}, version="v2")
+        cache.set("user11", "user2", {"compatibilityScore": 70.0}, version="v1")
+        
+        assert cache.clear_user_cache("user1") == 2
+        assert cache.get("user1", "user2", version="v1") is None
+        assert cache.get("user3", "user1", version="v2") is None
+        # IDs containing the user's ID are left alone
+        assert cache.get("user11", "user2", version="v1") is not None
@@ -2,9 +2,10 @@
 Unit tests for compatibility calculator.
 """
 
+import numpy as np
 import pytest
 from datetime import datetime, timedelta, timezone
-from services.compatibility_calculator import CompatibilityCalculator
+from services.compatibility_calculator import CompatibilityCalculator, _compile_base_answers
 
 
 class TestPersonalityScore:
@@ -233,6 +234,19 @@ class TestPersonalityScore:
         # Should handle all types correctly
         assert 0.0 <= result["personalityScore"] <= 1.0
 
+    def test_multiple_choice_jaccard_similarity(self):
+        """Test Jaccard similarity for multiple choice answers."""
+        answers1 = [{"questionId": "q1", "multipleChoiceAnswer": ["a", "b", "c"]}]
+        answers2 = [{"questionId": "q1", "multipleChoiceAnswer": ["b", "c", "d", "c"]}]
+
+        result = CompatibilityCalculator.calculate_personality_score(
+            user1_answers=answers1,
+            user2_answers=answers2,
+        )
+
+        # 2 common choices out of 4 distinct choices
+        assert result["personalityScore"] == 0.5
+
 
 class TestSharedInterests:
     """Test suite for shared interests extraction."""
@@ -283,6 +297,23 @@ class TestSharedInterests:
         
         assert set(result) == set(interests)
 
+    def test_batch_matches_pairwise(self):
+        """Batch extraction should match pairwise extraction for each candidate."""
+        base = ["Hiking", "reading", "Travel", "cooking"]
+        candidates = [
+            ["travel", "HIKING", "yoga"],
+            [],
+            ["yoga", "chess"],
+            ["cooking", "Reading", "reading"],
+            ["hiking", "travel"],
+        ]
+        result = CompatibilityCalculator.shared_interests_batch(base, candidates)
+
+        assert result == [
+            CompatibilityCalculator.extract_shared_interests(base, c) for c in candidates
+        ]
+        assert result[0] is not result[4]
+
 
 class TestCompatibilityV1:
     """Test suite for V1 compatibility calculation."""
@@ -334,6 +365,116 @@ class TestCompatibilityV1:
         assert 0 <= result["compatibilityScore"] <= 100
 
 
+class TestCompatibilityV1Batch:
+    """Test suite for batch V1 compatibility calculation."""
+
+    BASE_PROFILE = {
+        "personalityAnswers": [
+            {"questionId": "q1", "numericAnswer": 7, "category": "values"},
+            {"questionId": "q2", "booleanAnswer": True, "category": "lifestyle"},
+            {
+                "questionId": "q3",
+                "multipleChoiceAnswer": ["a", "b"],
+                "category": "communication",
+            },
+            {"questionId": "q4", "textAnswer": "Adventure", "category": "personality"},
+            {"questionId": "q5", "numericAnswer": 3, "category": "hobbies"},
+            {"questionId": "q6", "numericAnswer": 5, "booleanAnswer": False},
+        ],
+        "interests": ["Hiking", "reading"],
+    }
+
+    CANDIDATES = [
+        {
+            "personalityAnswers": [
+                {"questionId": "q1", "numericAnswer": 8, "category": "values"},
+                {"questionId": "q2", "booleanAnswer": False, "category": "lifestyle"},
+                {
+                    "questionId": "q3",
+                    "multipleChoiceAnswer": ["b", "c"],
+                    "category": "communication",
+                },
+                {"questionId": "q4", "textAnswer": "adventure"},
+            ],
+            "interests": ["reading", "travel"],
+        },
+        {
+            "personalityAnswers": [
+                {"questionId": "q5", "numericAnswer": 9},
+                {"questionId": "q6", "booleanAnswer": False},
+                {"questionId": "q4", "textAnswer": "Relaxation"},
+                {"questionId": "q2", "numericAnswer": 4},
+            ],
+            "interests": ["hiking"],
+        },
+        {
+            "personalityAnswers": [
+                {"questionId": "q9", "numericAnswer": 1},
+            ],
+            "interests": [],
+        },
+        {
+            "personalityAnswers": [],
+            "interests": ["cooking"],
+        },
+        {
+            "personalityAnswers": [
+                {"questionId": "q1", "numericAnswer": 2},
+                {"questionId": "q1", "numericAnswer": 6},
+                {"questionId": "q3", "multipleChoiceAnswer": []},
+                {"questionId": "q6", "numericAnswer": 5},
+            ],
+        },
+    ]
+
+    def test_batch_matches_pairwise_results(self):
+        """Batch results should be identical to pairwise V1 results."""
+        results = CompatibilityCalculator.calculate_compatibility_v1_batch(
+            user_profile=self.BASE_PROFILE,
+            profiles=self.CANDIDATES,
+        )
+
+        assert len(results) == len(self.CANDIDATES)
+        for candidate, result in zip(self.CANDIDATES, results):
+            expected = CompatibilityCalculator.calculate_compatibility_v1(
+                user1_profile=self.BASE_PROFILE,
+                user2_profile=candidate,
+            )
+            assert result == expected
+
+    def test_batch_without_base_answers_neutral_scores(self):
+        """A base user without answers should get neutral scores for all candidates."""
+        results = CompatibilityCalculator.calculate_compatibility_v1_batch(
+            user_profile={"interests": ["hiking"]},
+            profiles=self.CANDIDATES,
+        )
+
+        assert all(r["compatibilityScore"] == 50.0 for r in results)
+
+    def test_batch_with_no_profiles_empty_list(self):
+        """An empty candidate list should return an empty result list."""
+        results = CompatibilityCalculator.calculate_compatibility_v1_batch(
+            user_profile=self.BASE_PROFILE,
+            profiles=[],
+        )
+
+        assert results == []
+
+    def test_base_answers_compiled_once(self):
+        """The base user's answers should be reused across batches."""
+        _compile_base_answers.cache_clear()
+
+        for _ in range(3):
+            CompatibilityCalculator.calculate_compatibility_v1_batch(
+                user_profile=self.BASE_PROFILE,
+                profiles=self.CANDIDATES,
+            )
+
+        info = _compile_base_answers.cache_info()
+        assert info.misses == 1
+        assert info.hits == 2
+
+
 class TestCompatibilityV2:
     """Test suite for V2 compatibility calculation."""
 
@@ -505,6 +646,74 @@ class TestCompatibilityV2:
         # Active users should score higher
         assert active_result["compatibilityScore"] > inactive_result["compatibilityScore"]
 
+    def test_v2_fingerprint_covers_advanced_fields(self):
+        """V2 fingerprints should change with the fields only V2 scoring reads."""
+        profile = {"userId": "user1", "interests": ["music"], "matchesCount": 0}
+        active = {**profile, "matchesCount": 3}
+
+        assert CompatibilityCalculator.profile_fingerprint(profile) == (
+            CompatibilityCalculator.profile_fingerprint(active)
+        )
+        assert CompatibilityCalculator.profile_fingerprint_v2(profile) != (
+            CompatibilityCalculator.profile_fingerprint_v2(active)
+        )
+
+
+class TestCompatibilityV2Batch:
+    """Test suite for batch V2 compatibility calculation."""
+
+    def test_batch_matches_pairwise_results(self):
+        """Batch results should be identical to pairwise V2 results."""
+        # Activity older than 60 days scores exactly 0.0, so results do not
+        # depend on the time between the two calculations
+        long_ago = datetime.now(timezone.utc) - timedelta(days=90)
+        base_profile = {
+            **TestCompatibilityV1Batch.BASE_PROFILE,
+            "age": 30,
+            "preferences": {"minAge": 25, "maxAge": 35, "maxDistance": 50, "gender": "female"},
+            "latitude": 48.85,
+            "longitude": 2.35,
+            "messagesSent": 40,
+            "messagesReceived": 30,
+            "matchesCount": 3,
+        }
+        candidates = [
+            {
+                **candidate,
+                "age": 22 + 4 * i,
+                "gender": "female" if i % 2 else "male",
+                "latitude": 48.85 + i,
+                "longitude": 2.35,
+                "lastActiveAt": long_ago if i % 2 else None,
+                "messagesSent": 10 * i,
+                "messagesReceived": 7 * (4 - i),
+                "matchesCount": i,
+            }
+            for i, candidate in enumerate(TestCompatibilityV1Batch.CANDIDATES)
+        ]
+
+        results = CompatibilityCalculator.calculate_compatibility_v2_batch(
+            user_profile=base_profile,
+            profiles=candidates,
+        )
+
+        assert len(results) == len(candidates)
+        for candidate, result in zip(candidates, results):
+            expected = CompatibilityCalculator.calculate_compatibility_v2(
+                user1_profile=base_profile,
+                user2_profile=candidate,
+            )
+            assert result == expected
+
+    def test_batch_empty_profiles(self):
+        """An empty candidate list should give no results."""
+        results = CompatibilityCalculator.calculate_compatibility_v2_batch(
+            user_profile=TestCompatibilityV1Batch.BASE_PROFILE,
+            profiles=[],
+        )
+
+        assert results == []
+
 
 class TestDealbreakerAlignment:
     """Test suite for dealbreaker alignment calculation."""
@@ -566,3 +775,228 @@ class TestDealbreakerAlignment:
         )
         
         assert alignment == 0.7
+
+    def test_distance_outside_preference_lowers_score(self):
+        """User farther than max distance should lower alignment."""
+        profile1 = {
+            "preferences": {"maxDistance": 50},
+            "latitude": 48.85,
+            "longitude": 2.35,
+        }
+        profile2 = {
+            "latitude": 45.76,  # ~340km away
+            "longitude": 4.83,
+        }
+
+        alignment = CompatibilityCalculator._calculate_dealbreaker_alignment(
+            user1_profile=profile1,
+            user2_profile=profile2,
+        )
+
+        assert alignment == 0.8
+
+    def test_precomputed_distance_is_used(self):
+        """A precomputed distance should be used instead of recomputing it."""
+        profile1 = {
+            "preferences": {"maxDistance": 50},
+            "latitude": 48.85,
+            "longitude": 2.35,
+        }
+        profile2 = {
+            "latitude": 45.76,
+            "longitude": 4.83,
+        }
+
+        alignment = CompatibilityCalculator._calculate_dealbreaker_alignment(
+            user1_profile=profile1,
+            user2_profile=profile2,
+            distance_km=10.0,
+        )
+
+        assert alignment == 1.0
+
+    def test_batch_alignments_match_pairwise(self):
+        """Batch alignments should match pairwise alignments for every check."""
+        users = [
+            {},
+            {"preferences": {"minAge": 25, "maxAge": 35}},
+            {
+                "preferences": {"minAge": 25, "maxAge": 35, "maxDistance": 100, "gender": "female"},
+                "latitude": 48.85,
+                "longitude": 2.35,
+            },
+            {"preferences": {"gender": "any", "maxDistance": 10}},
+        ]
+        profiles = [
+            {},
+            {"age": 30, "gender": "female", "latitude": 48.9, "longitude": 2.4},
+            {"age": 40, "gender": "male", "latitude": 45.76, "longitude": 4.83},
+            {"age": 0, "gender": "", "latitude": 0.0, "longitude": 2.35},
+            {"age": 22, "gender": "male"},
+        ]
+
+        for user in users:
+            alignments = CompatibilityCalculator._calculate_dealbreaker_alignments(user, profiles)
+
+            assert alignments.tolist() == [
+                CompatibilityCalculator._calculate_dealbreaker_alignment(user, profile)
+                for profile in profiles
+            ]
+
+    def test_batch_distances_match_pairwise(self):
+        """Batch distances should match pair distances, missing data included."""
+        user = {"latitude": 48.85, "longitude": 2.35}
+        profiles = [
+            {"latitude": 45.76, "longitude": 4.83},
+            {"latitude": 48.85, "longitude": 2.35},
+            {"latitude": None, "longitude": 4.83},
+            {"latitude": 0.0, "longitude": 4.83},
+            {},
+        ]
+
+        distances = CompatibilityCalculator._approximate_distances_km(user, profiles)
+
+        assert distances[:2].tolist() == [
+            CompatibilityCalculator._approximate_distance_km(user, profile)
+            for profile in profiles[:2]
+        ]
+        assert np.isnan(distances[2:]).all()
+        assert all(
+            CompatibilityCalculator._approximate_distance_km(user, profile) is None
+            for profile in profiles[2:]
+        )
+
+
+class TestBasicCompatibilityFilter:
+    """Test suite for basic compatibility filtering."""
+
+    USER = {
+        "userId": "user",
+        "age": 30,
+        "gender": "female",
+        "preferences": {"minAge": 25, "maxAge": 35, "gender": "male", "maxDistance": 50},
+        "latitude": 48.85,
+        "longitude": 2.35,
+    }
+
+    def test_mutual_criteria_filtering(self):
+        """Only profiles matching criteria on both sides should be kept."""
+        profiles = [
+            {"userId": "match", "age": 28, "gender": "male", "latitude": 48.86, "longitude": 2.34},
+            {"userId": "too_old", "age": 45, "gender": "male"},
+            {"userId": "wrong_gender", "age": 28, "gender": "female"},
+            {"userId": "too_far", "age": 28, "gender": "male", "latitude": 45.76, "longitude": 4.83},
+            {
+                "userId": "user_too_old_for_them",
+                "age": 28,
+                "gender": "male",
+                "preferences": {"minAge": 20, "maxAge": 25},
+            },
+            {
+                "userId": "user_wrong_gender_for_them",
+                "age": 28,
+                "gender": "male",
+                "preferences": {"gender": "male"},
+            },
+        ]
+
+        result = CompatibilityCalculator.filter_basic_compatibility(
+            user_profile=self.USER,
+            profiles=profiles,
+        )
+
+        assert [p["userId"] for p in result] == ["match"]
+
+    def test_missing_data_skips_checks(self):
+        """Checks without data on either side should not exclude profiles."""
+        profiles = [
+            {"userId": "no_data"},
+            {"userId": "any_gender", "age": 30, "gender": "male", "preferences": {"gender": "any"}},
+        ]
+
+        result = CompatibilityCalculator.filter_basic_compatibility(
+            user_profile=self.USER,
+            profiles=profiles,
+        )
+
+        assert [p["userId"] for p in result] == ["no_data", "any_gender"]
+
+    def test_empty_profiles_empty_result(self):
+        """An empty candidate list should return an empty list."""
+        assert CompatibilityCalculator.filter_basic_compatibility(self.USER, []) == []
+
+    def test_mask_aligned_with_profiles(self):
+        """The mask should have one entry per profile, in order."""
+        profiles = [
+            {"userId": "too_old", "age": 45},
+            {"userId": "match", "age": 30},
+        ]
+
+        mask = CompatibilityCalculator.basic_compatibility_mask(
+            user_profile=self.USER,
+            profiles=profiles,
+        )
+
+        assert mask.tolist() == [False, True]
+
+    def test_interested_in_genders(self):
+        """Candidates should match any of the user's accepted genders."""
+        user = {
+            "gender": "female",
+            "preferences": {"interestedInGenders": ["male", "other"]},
+        }
+        profiles = [
+            {"userId": "male", "gender": "male"},
+            {"userId": "female", "gender": "female"},
+            {"userId": "other", "gender": "other"},
+            {
+                "userId": "not_interested",
+                "gender": "male",
+                "preferences": {"interestedInGenders": ["male"]},
+            },
+        ]
+
+        result = CompatibilityCalculator.filter_basic_compatibility(
+            user_profile=user,
+            profiles=profiles,
+        )
+
+        assert [p["userId"] for p in result] == ["male", "other"]
+
+    def test_gender_vocabularies_normalized(self):
+        """main-api genders should match database genders, unknown ones skip the check."""
+        user = {
+            "gender": "woman",
+            "preferences": {"interestedInGenders": ["man", "non_binary"]},
+        }
+        profiles = [
+            {"userId": "male", "gender": "male"},
+            {"userId": "man", "gender": "Man"},
+            {"userId": "non_binary", "gender": "non_binary"},
+            {"userId": "female", "gender": "female"},
+            {"userId": "unknown", "gender": "unspecified"},
+            {
+                "userId": "interested_in_female",
+                "gender": "man",
+                "preferences": {"interestedInGenders": ["female"]},
+            },
+            {
+                "userId": "interested_in_unknown",
+                "gender": "man",
+                "preferences": {"interestedInGenders": ["unspecified"]},
+            },
+        ]
+
+        result = CompatibilityCalculator.filter_basic_compatibility(
+            user_profile=user,
+            profiles=profiles,
+        )
+
+        assert [p["userId"] for p in result] == [
+            "male",
+            "man",
+            "non_binary",
+            "unknown",
+            "interested_in_female",
+            "interested_in_unknown",
+        ]
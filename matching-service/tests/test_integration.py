@@ -2,9 +2,13 @@
 Integration test to verify the matching service is properly set up and accessible.
 
 This test simulates how the NestJS API would call the matching service.
+Requests go to the app in-process; set RUN_E2E=1 to send them over HTTP to
+a running service instead.
 """
 
+import os
 import pytest
+import pytest_asyncio
 import httpx
 from typing import Dict, Any
 
@@ -12,14 +16,31 @@ from typing import Dict, Any
 # Service configuration
 MATCHING_SERVICE_URL = "http://localhost:8000"
 API_KEY = "matching-service-secret-key"
+RUN_E2E = os.getenv("RUN_E2E") == "1"
 
 
-@pytest.mark.asyncio
-async def test_service_health():
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def client():
+    """Client shared by the module's tests, so keep-alive connections are reused."""
+    if RUN_E2E:
+        transport, base_url = None, MATCHING_SERVICE_URL
+    else:
+        from main import app
+        transport, base_url = httpx.ASGITransport(app=app), "http://test"
+    
+    async with httpx.AsyncClient(
+        transport=transport,
+        base_url=base_url,
+        headers={"X-API-Key": API_KEY},
+    ) as client:
+        yield client
+
+
+@pytest.mark.asyncio(loop_scope="module")
+async def test_service_health(client):
     """Test that the matching service is running and healthy."""
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{MATCHING_SERVICE_URL}/health")
-        
+    response = await client.get("/health")
+    
     assert response.status_code == 200
     data = response.json()
     assert data["status"] == "healthy"
@@ -27,8 +48,8 @@ async def test_service_health():
     assert "timestamp" in data
 
 
-@pytest.mark.asyncio
-async def test_v1_calculate_compatibility_with_profiles():
+@pytest.mark.asyncio(loop_scope="module")
+async def test_v1_calculate_compatibility_with_profiles(client):
     """
     Test V1 compatibility calculation with full profile data.
     This is how NestJS would call when database is not shared.
@@ -70,12 +91,10 @@ async def test_v1_calculate_compatibility_with_profiles():
         }
     }
     
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            f"{MATCHING_SERVICE_URL}/api/v1/matching-service/calculate-compatibility",
-            json=request_data,
-            headers={"X-API-Key": API_KEY}
-        )
+    response = await client.post(
+        "/api/v1/matching-service/calculate-compatibility",
+        json=request_data,
+    )
     
     assert response.status_code == 200
     data = response.json()
@@ -91,8 +110,8 @@ async def test_v1_calculate_compatibility_with_profiles():
     assert "travel" in data["sharedInterests"]
 
 
-@pytest.mark.asyncio
-async def test_generate_daily_selection_with_profiles():
+@pytest.mark.asyncio(loop_scope="module")
+async def test_generate_daily_selection_with_profiles(client):
     """
     Test daily selection generation with full profile data.
     This endpoint is used when the NestJS API provides all profile data.
@@ -128,12 +147,10 @@ async def test_generate_daily_selection_with_profiles():
         "selectionSize": 2
     }
     
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            f"{MATCHING_SERVICE_URL}/api/v1/matching-service/generate-daily-selection",
-            json=request_data,
-            headers={"X-API-Key": API_KEY}
-        )
+    response = await client.post(
+        "/api/v1/matching-service/generate-daily-selection",
+        json=request_data,
+    )
     
     assert response.status_code == 200
     data = response.json()
@@ -149,34 +166,32 @@ async def test_generate_daily_selection_with_profiles():
         assert 0 <= data["scores"][user_id] <= 100
 
 
-@pytest.mark.asyncio
-async def test_api_key_required():
+@pytest.mark.asyncio(loop_scope="module")
+async def test_api_key_required(client):
     """Test that endpoints require valid API key."""
-    async with httpx.AsyncClient() as client:
-        # Try with invalid API key
-        response = await client.post(
-            f"{MATCHING_SERVICE_URL}/api/v1/matching-service/calculate-compatibility",
-            json={
-                "user1Profile": {
-                    "userId": "user-1",
-                    "personalityAnswers": []
-                },
-                "user2Profile": {
-                    "userId": "user-2",
-                    "personalityAnswers": []
-                }
+    # Try with invalid API key
+    response = await client.post(
+        "/api/v1/matching-service/calculate-compatibility",
+        json={
+            "user1Profile": {
+                "userId": "user-1",
+                "personalityAnswers": []
             },
-            headers={"X-API-Key": "invalid-key"}
-        )
+            "user2Profile": {
+                "userId": "user-2",
+                "personalityAnswers": []
+            }
+        },
+        headers={"X-API-Key": "invalid-key"}
+    )
     
     assert response.status_code == 401  # Unauthorized with wrong API key
 
 
-@pytest.mark.asyncio
-async def test_swagger_ui_accessible():
+@pytest.mark.asyncio(loop_scope="module")
+async def test_swagger_ui_accessible(client):
     """Test that Swagger UI documentation is accessible."""
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{MATCHING_SERVICE_URL}/docs")
+    response = await client.get("/docs")
     
     assert response.status_code == 200
     assert "swagger" in response.text.lower()
@@ -184,36 +199,45 @@ async def test_swagger_ui_accessible():
 
 if __name__ == "__main__":
     """
-    Run integration tests manually.
+    Run integration tests manually against a running service.
     
     Before running:
     1. Start the matching service: python main.py
     2. Run: python tests/test_integration.py
     """
     import asyncio
+    import sys
+    
+    checks = [
+        ("Health check", test_service_health),
+        ("Compatibility calculation", test_v1_calculate_compatibility_with_profiles),
+        ("Daily selection", test_generate_daily_selection_with_profiles),
+        ("API key validation", test_api_key_required),
+        ("Swagger UI", test_swagger_ui_accessible),
+    ]
     
     async def run_tests():
         print("Running integration tests...")
-        print("\n1. Testing service health...")
-        await test_service_health()
-        print("✓ Health check passed")
-        
-        print("\n2. Testing V1 compatibility calculation...")
-        await test_v1_calculate_compatibility_with_profiles()
-        print("✓ Compatibility calculation passed")
-        
-        print("\n3. Testing daily selection generation...")
-        await test_generate_daily_selection_with_profiles()
-        print("✓ Daily selection passed")
-        
-        print("\n4. Testing API key validation...")
-        await test_api_key_required()
-        print("✓ API key validation passed")
+        async with httpx.AsyncClient(
+            base_url=MATCHING_SERVICE_URL,
+            headers={"X-API-Key": API_KEY},
+        ) as client:
+            # Checks are independent, run them concurrently
+            results = await asyncio.gather(
+                *(check(client) for _, check in checks),
+                return_exceptions=True,
+            )
         
-        print("\n5. Testing Swagger UI...")
-        await test_swagger_ui_accessible()
-        print("✓ Swagger UI accessible")
+        failed = False
+        for (name, _), result in zip(checks, results):
+            if isinstance(result, BaseException):
+                failed = True
+                print(f"✗ {name} failed: {result!r}")
+            else:
+                print(f"✓ {name} passed")
         
+        if failed:
+            sys.exit(1)
         print("\n✅ All integration tests passed!")
     
     asyncio.run(run_tests())
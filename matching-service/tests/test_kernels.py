@@ -0,0 +1,104 @@
+"""
+Unit tests for batch scoring kernels.
+"""
+
+import numpy as np
+import pytest
+from services import kernels
+
+
+def random_answers(num_candidates, num_questions, seed=0):
+    """Build random aligned answer arrays for the kernels."""
+    rng = np.random.default_rng(seed)
+    shape = (num_candidates, num_questions)
+    base_boolean = np.where(rng.random(num_questions) < 0.5, 1, -1).astype(np.int8)
+    return (
+        rng.random(shape) < 0.8,
+        np.where(rng.random(shape) < 0.3, rng.integers(1, 11, shape).astype(float), np.nan),
+        np.where(rng.random(shape) < 0.3, rng.integers(0, 2, shape), -1).astype(np.int8),
+        np.where(rng.random(shape) < 0.3, rng.random(shape), np.nan),
+        np.where(rng.random(shape) < 0.3, 0.5, np.nan),
+        np.where(rng.random(num_questions) < 0.5, rng.integers(1, 11, num_questions), np.nan),
+        base_boolean,
+        rng.integers(-1, 4, num_questions).astype(np.int8),
+        4,
+    )
+
+
+class TestScoreAnswers:
+    """Test suite for the answer scoring kernel."""
+
+    @pytest.mark.parametrize("shape", [(50, 20), (3, 1), (1, 0)])
+    def test_implementations_identical(self, shape):
+        """Loop and NumPy implementations should give identical results."""
+        arrays = random_answers(*shape)
+
+        expected = kernels._score_answers_numpy(*arrays)
+        for result in (kernels._score_answers_loop(*arrays), kernels.score_answers(*arrays)):
+            for actual, wanted in zip(result, expected):
+                assert np.array_equal(actual, wanted)
+
+    @pytest.mark.skipif(not kernels.NUMBA_AVAILABLE, reason="Requires numba")
+    def test_parallel_kernel_identical(self, monkeypatch):
+        """Batches above the threshold should score as in the serial kernel."""
+        arrays = random_answers(200, 20, seed=1)
+        expected = kernels._score_answers_loop(*arrays)
+
+        monkeypatch.setattr(kernels, "PARALLEL_MIN_CANDIDATES", 100)
+        for actual, wanted in zip(kernels.score_answers(*arrays), expected):
+            assert np.array_equal(actual, wanted)
+
+    def test_numeric_similarity(self):
+        """Numeric answers should score by distance on a 10 point scale."""
+        common, totals, category_sums, category_counts = kernels.score_answers(
+            np.array([[True, False]]),
+            np.array([[8.0, 3.0]]),
+            np.full((1, 2), -1, dtype=np.int8),
+            np.full((1, 2), np.nan),
+            np.full((1, 2), np.nan),
+            np.array([7.0, 3.0]),
+            np.full(2, -1, dtype=np.int8),
+            np.array([1, 1], dtype=np.int8),
+            4,
+        )
+
+        assert common.tolist() == [1]
+        assert totals.tolist() == [0.9]
+        assert category_sums[0, 1] == 0.9
+        assert category_counts[0].tolist() == [0, 1, 0, 0]
+
+    def test_warm_up(self):
+        """Warm up should not fail whether or not numba is installed."""
+        kernels.warm_up()
+
+
+class TestAdvancedFactors:
+    """Test suite for the advanced factors kernel."""
+
+    @pytest.mark.skipif(not kernels.NUMBA_AVAILABLE, reason="Requires numba")
+    def test_kernel_matches_numpy(self, monkeypatch):
+        """Compiled and NumPy advanced scores should be identical."""
+        from services import advanced_scoring
+
+        rng = np.random.default_rng(2)
+        size = 500
+        hours = rng.random(size) * 2000
+        hours[::7] = np.nan
+        targets = {
+            "hoursSinceActivity": hours,
+            "messagesSent": rng.integers(0, 60, size),
+            "messagesReceived": rng.integers(0, 60, size),
+            "matchesCount": rng.integers(0, 3, size),
+            "mutualInterests": rng.integers(0, 8, size),
+            "dealbreakerAlignment": rng.choice([0.3, 0.7, 1.0], size),
+        }
+        personality = rng.random(size)
+        user_data = {"messagesSent": 5, "messagesReceived": 4, "matchesCount": 2}
+
+        service = advanced_scoring.AdvancedScoringService
+        compiled = service.calculate_advanced_score_batch(user_data, targets, personality)
+        monkeypatch.setattr(advanced_scoring, "advanced_factors", None)
+        expected = service.calculate_advanced_score_batch(user_data, targets, personality)
+
+        for key, wanted in expected.items():
+            assert np.array_equal(compiled[key], wanted), key
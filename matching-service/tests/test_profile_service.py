@@ -0,0 +1,175 @@
+"""
+Unit tests for the profile service query helpers.
+"""
+
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy.dialects import postgresql
+
+from models.database_models import GenderEnum
+from services.profile_service import (
+    _age_cutoff,
+    _basic_criteria_conditions,
+    _build_profile,
+    _calculate_age,
+    _fetch_personality_answers,
+)
+
+
+class RecordingSession:
+    """Session stand-in returning canned rows and recording executed statements."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    def execute(self, statement):
+        self.statements.append(statement)
+        return iter(self.rows)
+
+
+class TestAgeCutoff:
+    """Test suite for birth date bounds of age ranges."""
+
+    def test_cutoff_matches_calculated_age(self):
+        """Birth dates before the cutoff should be exactly those old enough."""
+        today = datetime.now().date()
+
+        for age in (18, 30, 100):
+            cutoff = _age_cutoff(today, age)
+            for offset in (timedelta(days=-1), timedelta(hours=-1), timedelta(0), timedelta(days=1)):
+                birth_date = cutoff + offset
+                assert (_calculate_age(birth_date) >= age) == (birth_date < cutoff)
+
+    def test_cutoff_on_leap_day(self):
+        """People born on February 28th should be old enough on February 29th."""
+        cutoff = _age_cutoff(date(2024, 2, 29), 18)
+
+        assert cutoff == datetime(2006, 3, 1)
+
+
+class TestBasicCriteriaConditions:
+    """Test suite for the candidate query conditions."""
+
+    def test_conditions_for_each_criteria(self):
+        """Age ranges, accepted genders and distance should each add a condition."""
+        user_profile = {
+            "age": 30,
+            "latitude": 48.85,
+            "longitude": 2.35,
+            "preferences": {
+                "minAge": 25,
+                "maxAge": 35,
+                "maxDistance": 50,
+                "interestedInGenders": ["female"],
+            },
+        }
+
+        assert len(_basic_criteria_conditions(user_profile)) == 4
+
+    def test_no_conditions_without_data(self):
+        """Missing data or accepting any gender should not restrict the query."""
+        user_profile = {
+            "preferences": {"maxAge": 35, "maxDistance": 50, "interestedInGenders": ["any", "male"]},
+        }
+
+        assert _basic_criteria_conditions(user_profile) == []
+
+    def test_gender_condition_with_main_api_values(self):
+        """main-api genders should map to GenderEnum members, unknown ones are ignored."""
+        user_profile = {"preferences": {"interestedInGenders": ["woman", "Man", "unspecified"]}}
+
+        (condition,) = _basic_criteria_conditions(user_profile)
+
+        assert list(condition.compile().params.values()) == [[GenderEnum.FEMALE, GenderEnum.MALE]]
+
+    def test_no_gender_condition_without_mapped_values(self):
+        """Accepted genders without a GenderEnum member should not filter every candidate out."""
+        user_profile = {"preferences": {"interestedInGenders": ["non_binary", "unspecified"]}}
+
+        assert _basic_criteria_conditions(user_profile) == []
+
+
+class TestFetchPersonalityAnswers:
+    """Test suite for the aggregated personality answers query."""
+
+    def test_answers_keyed_by_user(self):
+        """Answers should be aggregated by the database into one JSON array per user."""
+        answers = [{"questionId": "q1", "category": "personality", "numericAnswer": 7}]
+        db = RecordingSession([("user-1", answers), ("user-2", [])])
+
+        result = _fetch_personality_answers(db, ["user-1", "user-2"])
+
+        assert result == {"user-1": answers, "user-2": []}
+        sql = str(db.statements[0].compile(dialect=postgresql.dialect()))
+        assert "json_agg(json_strip_nulls(json_build_object(" in sql
+        assert "coalesce(personality_answers.category" in sql
+        assert "GROUP BY personality_answers.\"userId\"" in sql
+
+    def test_no_query_without_users(self):
+        """No query should be sent for an empty list of users."""
+        db = RecordingSession([])
+
+        assert _fetch_personality_answers(db, []) == {}
+        assert db.statements == []
+
+
+class TestBuildProfile:
+    """Test suite for the mapping of profile rows to calculator profiles."""
+
+    ROW = {
+        "id": "user-1",
+        "lastActiveAt": datetime(2024, 1, 14, 9, 30, tzinfo=timezone.utc),
+        "createdAt": datetime(2023, 6, 1, tzinfo=timezone.utc),
+        "birthDate": datetime(1994, 1, 1),
+        "gender": GenderEnum.FEMALE,
+        "interests": ["hiking"],
+        "languages": None,
+        "interestedInGenders": ["man"],
+        "minAge": 25,
+        "maxAge": 40,
+        "maxDistance": 50,
+        "latitude": 48.85,
+        "longitude": 2.35,
+    }
+
+    def test_row_mapped_to_calculator_format(self):
+        """Columns should be converted to the fields the calculator reads."""
+        answers = [{"questionId": "q1", "category": "personality", "numericAnswer": 7}]
+
+        profile = _build_profile(self.ROW, answers)
+
+        assert profile["userId"] == "user-1"
+        assert profile["age"] == _calculate_age(self.ROW["birthDate"])
+        assert profile["gender"] == "female"
+        assert profile["languages"] == []
+        assert profile["personalityAnswers"] is answers
+        assert profile["preferences"] == {
+            "minAge": 25,
+            "maxAge": 40,
+            "gender": None,
+            "interestedInGenders": ["man"],
+            "maxDistance": 50,
+        }
+        assert profile["lastActiveAt"] == "2024-01-14T09:30:00+00:00"
+        assert profile["createdAt"] == "2023-06-01T00:00:00+00:00"
+
+    def test_missing_columns_mapped_to_none(self):
+        """NULL columns should give missing values rather than fail."""
+        row = {
+            **self.ROW,
+            "birthDate": None,
+            "gender": None,
+            "interests": None,
+            "interestedInGenders": None,
+            "lastActiveAt": None,
+            "createdAt": None,
+        }
+
+        profile = _build_profile(row, [])
+
+        assert profile["age"] is None
+        assert profile["gender"] is None
+        assert profile["interests"] == []
+        assert profile["preferences"]["interestedInGenders"] == []
+        assert profile["lastActiveAt"] is profile["lastLoginAt"] is profile["createdAt"] is None
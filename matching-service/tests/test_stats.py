@@ -0,0 +1,64 @@
+"""
+Unit tests for algorithm statistics tracking.
+"""
+
+from services.cache import CacheService
+from services.stats import StatsTracker
+
+
+class RecordingCache(CacheService):
+    """Cache service that records stats increments instead of using Redis."""
+
+    def __init__(self):
+        super().__init__(enabled=False)
+        self.increments = []
+
+    def increment_stats(self, **kwargs):
+        self.increments.append(kwargs)
+        return True
+
+
+class TestStatsTracker:
+    """Test suite for StatsTracker."""
+
+    def test_record_updates_snapshot(self):
+        """Recorded calculations should be counted in the snapshot."""
+        stats = StatsTracker(CacheService(enabled=False))
+
+        stats.record([80.0, 60.0])
+        stats.record([90.0], v2=True)
+        snapshot = stats.snapshot()
+
+        assert snapshot["total_calculations"] == 3
+        assert snapshot["total_v2_calculations"] == 1
+        assert snapshot["total_score"] == 230.0
+        assert snapshot["last_update"]
+
+    def test_flush_sends_pending_once(self):
+        """Flush should push calculations recorded since the last flush."""
+        cache = RecordingCache()
+        stats = StatsTracker(cache)
+
+        stats.record([80.0, 60.0])
+        stats.record([90.0], v2=True)
+        assert stats.flush() is True
+        assert stats.flush() is True
+
+        assert len(cache.increments) == 1
+        assert cache.increments[0]["calculations"] == 3
+        assert cache.increments[0]["v2_calculations"] == 1
+        assert cache.increments[0]["score_sum"] == 230.0
+
+    def test_failed_flush_keeps_pending(self):
+        """Calculations should be retried when Redis is unavailable."""
+        stats = StatsTracker(CacheService(enabled=False))
+        stats.record([80.0])
+        assert stats.flush() is False
+
+        cache = RecordingCache()
+        stats.cache = cache
+        stats.record([60.0])
+        assert stats.flush() is True
+
+        assert cache.increments[0]["calculations"] == 2
+        assert cache.increments[0]["score_sum"] == 140.0
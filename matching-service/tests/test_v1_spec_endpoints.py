@@ -6,24 +6,114 @@ These tests verify the new endpoints that match the TACHES_BACKEND.md specificat
 - POST /api/matching/calculate-compatibility
 """
 
+import asyncio
 import pytest
-from httpx import AsyncClient
+import pytest_asyncio
+from datetime import datetime, timezone
+from httpx import ASGITransport, AsyncClient
 from fastapi import status
 
+import main
+from database import get_db
 from main import app
+from models.database_models import GenderEnum
+from models.schemas import (
+    CalculateCompatibilityResponseV1,
+    GenerateSelectionResponse,
+    ScoreBreakdown,
+    SelectionProfile,
+)
+from services.compatibility_calculator import CompatibilityCalculator
+from services.profile_service import _build_profile
 
 
 # Test API key
 TEST_API_KEY = "matching-service-secret-key"
 
 
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def client():
+    """In-process client shared by the module's endpoint tests."""
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+def without_db(monkeypatch):
+    """Run the request as if the database was not configured."""
+    monkeypatch.setattr(main, "DB_ENABLED", False)
+    app.dependency_overrides[get_db] = lambda: None
+    yield
+    app.dependency_overrides.pop(get_db, None)
+
+
+def seeded_row(user_id, gender, birth_year, **fields):
+    """Profile row as read by the profile service, with defaults for other columns."""
+    return {
+        "id": user_id,
+        "lastActiveAt": datetime(2024, 1, 14, tzinfo=timezone.utc),
+        "createdAt": datetime(2023, 6, 1, tzinfo=timezone.utc),
+        "birthDate": datetime(birth_year, 1, 1),
+        "gender": gender,
+        "interests": ["hiking", "reading"],
+        "languages": ["fr"],
+        "interestedInGenders": [],
+        "minAge": None,
+        "maxAge": None,
+        "maxDistance": None,
+        "latitude": 48.85,
+        "longitude": 2.35,
+        **fields,
+    }
+
+
+@pytest.fixture
+def seeded_db(monkeypatch):
+    """
+    Run the request against seeded profiles instead of the database.
+    
+    Rows go through the profile service's row mapping; unlike the real
+    query, candidates are not prefiltered, leaving that to the handler.
+    """
+    answers = [
+        {"questionId": "q1", "category": "personality", "numericAnswer": 7},
+        {"questionId": "q2", "category": "values", "booleanAnswer": True},
+    ]
+    rows = [
+        seeded_row(
+            "user-1",
+            GenderEnum.FEMALE,
+            1994,
+            interestedInGenders=["man"],
+            minAge=25,
+            maxAge=40,
+        ),
+        seeded_row("match-1", GenderEnum.MALE, 1992),
+        seeded_row("match-2", GenderEnum.MALE, 1990, interests=["hiking"]),
+        seeded_row("match-3", GenderEnum.MALE, 1988, interests=["cooking"]),
+        seeded_row("excluded", GenderEnum.MALE, 1992),
+        seeded_row("wrong-gender", GenderEnum.FEMALE, 1992),
+        seeded_row("too-young", GenderEnum.MALE, 2005),
+    ]
+    profiles = {row["id"]: _build_profile(row, answers) for row in rows}
+    
+    def fetch_available_profiles(db, user_id, exclude_user_ids, limit=100, user_profile=None):
+        excluded = set(exclude_user_ids) | {user_id}
+        return [profile for key, profile in profiles.items() if key not in excluded][:limit]
+    
+    monkeypatch.setattr(main, "DB_ENABLED", True)
+    monkeypatch.setattr(main, "fetch_user_profile", lambda db, user_id: profiles.get(user_id))
+    monkeypatch.setattr(main, "fetch_available_profiles", fetch_available_profiles)
+    app.dependency_overrides[get_db] = lambda: None
+    yield profiles
+    app.dependency_overrides.pop(get_db, None)
+
+
 class TestGenerateMatchReasons:
     """Tests for the generate_match_reasons function."""
     
     def test_high_compatibility_all_areas(self):
         """Test match reasons generation for high compatibility."""
-        from services.compatibility_calculator import CompatibilityCalculator
-        
         breakdown = {
             "personality": 85.0,
             "interests": 75.0,
@@ -47,8 +137,6 @@ class TestGenerateMatchReasons:
     
     def test_low_compatibility_generic_reason(self):
         """Test that low compatibility still generates a reason."""
-        from services.compatibility_calculator import CompatibilityCalculator
-        
         breakdown = {
             "personality": 40.0,
             "interests": 30.0,
@@ -71,8 +159,6 @@ class TestGenerateMatchReasons:
     
     def test_shared_interests_mentioned(self):
         """Test that shared interests are mentioned in reasons."""
-        from services.compatibility_calculator import CompatibilityCalculator
-        
         breakdown = {
             "personality": 70.0,
             "interests": 75.0,
@@ -98,141 +184,155 @@ class TestGenerateMatchReasons:
 class TestGenerateSelectionEndpoint:
     """Tests for POST /api/matching/generate-selection endpoint."""
     
-    @pytest.mark.asyncio
-    async def test_generate_selection_no_api_key(self):
-        """Test that endpoint requires API key."""
-        async with AsyncClient(app=app, base_url="http://test") as client:
-            response = await client.post(
-                "/api/matching/generate-selection",
-                json={
-                    "userId": "user-123",
-                    "count": 5,
-                    "excludeUserIds": [],
-                },
-            )
-        
-        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
-    
-    @pytest.mark.asyncio
-    async def test_generate_selection_invalid_api_key(self):
-        """Test that endpoint rejects invalid API key."""
-        async with AsyncClient(app=app, base_url="http://test") as client:
-            response = await client.post(
-                "/api/matching/generate-selection",
-                json={
-                    "userId": "user-123",
-                    "count": 5,
-                    "excludeUserIds": [],
-                },
-                headers={"X-API-Key": "invalid-key"},
-            )
+    @pytest.mark.parametrize(
+        "headers, status_code",
+        [
+            ({}, status.HTTP_422_UNPROCESSABLE_ENTITY),  # Missing required header
+            ({"X-API-Key": "invalid-key"}, status.HTTP_401_UNAUTHORIZED),
+        ],
+    )
+    @pytest.mark.asyncio(loop_scope="module")
+    async def test_generate_selection_rejects_missing_or_invalid_api_key(
+        self, client, headers, status_code
+    ):
+        """Test that endpoint requires a valid API key."""
+        response = await client.post(
+            "/api/matching/generate-selection",
+            json={
+                "userId": "user-123",
+                "count": 5,
+                "excludeUserIds": [],
+            },
+            headers=headers,
+        )
         
-        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert response.status_code == status_code
     
-    @pytest.mark.asyncio
-    async def test_generate_selection_without_db(self):
+    @pytest.mark.asyncio(loop_scope="module")
+    async def test_generate_selection_without_db(self, client, without_db):
         """Test endpoint behavior without database connection."""
-        async with AsyncClient(app=app, base_url="http://test") as client:
-            response = await client.post(
-                "/api/matching/generate-selection",
-                json={
-                    "userId": "user-123",
-                    "count": 5,
-                    "excludeUserIds": [],
-                },
-                headers={"X-API-Key": TEST_API_KEY},
-            )
+        response = await client.post(
+            "/api/matching/generate-selection",
+            json={
+                "userId": "user-123",
+                "count": 5,
+                "excludeUserIds": [],
+            },
+            headers={"X-API-Key": TEST_API_KEY},
+        )
         
-        # Should return 503 if DB not available, or process if DB is available
-        assert response.status_code in [
-            status.HTTP_503_SERVICE_UNAVAILABLE,
-            status.HTTP_404_NOT_FOUND,  # User not found (expected with test DB)
-            status.HTTP_200_OK,
-        ]
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
     
-    @pytest.mark.asyncio
-    async def test_generate_selection_validates_count(self):
-        """Test that count parameter is validated (3-5)."""
-        async with AsyncClient(app=app, base_url="http://test") as client:
-            # Try count = 2 (too low)
-            response = await client.post(
-                "/api/matching/generate-selection",
-                json={
-                    "userId": "user-123",
-                    "count": 2,
-                    "excludeUserIds": [],
-                },
-                headers={"X-API-Key": TEST_API_KEY},
-            )
+    @pytest.mark.asyncio(loop_scope="module")
+    async def test_generate_selection_with_seeded_db(self, client, seeded_db):
+        """Test the selection of seeded profiles passing the basic criteria."""
+        response = await client.post(
+            "/api/matching/generate-selection",
+            json={
+                "userId": "user-1",
+                "count": 5,
+                "excludeUserIds": ["excluded"],
+            },
+            headers={"X-API-Key": TEST_API_KEY},
+        )
         
-        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert response.status_code == status.HTTP_200_OK
+        selection = GenerateSelectionResponse(**response.json()).selection
+        assert sorted(profile.userId for profile in selection) == ["match-1", "match-2", "match-3"]
+        scores = [profile.compatibilityScore for profile in selection]
+        assert scores == sorted(scores, reverse=True)
+        assert all(profile.matchReasons for profile in selection)
+    
+    @pytest.mark.asyncio(loop_scope="module")
+    async def test_generate_selection_unknown_user(self, client, seeded_db):
+        """Test that an unknown user is reported as not found."""
+        response = await client.post(
+            "/api/matching/generate-selection",
+            json={"userId": "missing", "count": 3},
+            headers={"X-API-Key": TEST_API_KEY},
+        )
         
-        async with AsyncClient(app=app, base_url="http://test") as client:
-            # Try count = 6 (too high)
-            response = await client.post(
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+    
+    @pytest.mark.asyncio(loop_scope="module")
+    async def test_generate_selection_validates_count(self, client):
+        """Test that count parameter is validated (3-5)."""
+        # Try count = 2 (too low) and count = 6 (too high) concurrently
+        too_low, too_high = await asyncio.gather(*(
+            client.post(
                 "/api/matching/generate-selection",
                 json={
                     "userId": "user-123",
-                    "count": 6,
+                    "count": count,
                     "excludeUserIds": [],
                 },
                 headers={"X-API-Key": TEST_API_KEY},
             )
+            for count in (2, 6)
+        ))
         
-        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert too_low.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert too_high.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
 
 
 class TestCalculateCompatibilityV1Spec:
     """Tests for POST /api/matching/calculate-compatibility endpoint."""
     
-    @pytest.mark.asyncio
-    async def test_calculate_compatibility_no_api_key(self):
-        """Test that endpoint requires API key."""
-        async with AsyncClient(app=app, base_url="http://test") as client:
-            response = await client.post(
-                "/api/matching/calculate-compatibility",
-                json={
-                    "userId1": "user-1",
-                    "userId2": "user-2",
-                },
-            )
+    @pytest.mark.parametrize(
+        "headers, status_code",
+        [
+            ({}, status.HTTP_422_UNPROCESSABLE_ENTITY),  # Missing required header
+            ({"X-API-Key": "invalid-key"}, status.HTTP_401_UNAUTHORIZED),
+        ],
+    )
+    @pytest.mark.asyncio(loop_scope="module")
+    async def test_calculate_compatibility_rejects_missing_or_invalid_api_key(
+        self, client, headers, status_code
+    ):
+        """Test that endpoint requires a valid API key."""
+        response = await client.post(
+            "/api/matching/calculate-compatibility",
+            json={
+                "userId1": "user-1",
+                "userId2": "user-2",
+            },
+            headers=headers,
+        )
         
-        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert response.status_code == status_code
     
-    @pytest.mark.asyncio
-    async def test_calculate_compatibility_invalid_api_key(self):
-        """Test that endpoint rejects invalid API key."""
-        async with AsyncClient(app=app, base_url="http://test") as client:
-            response = await client.post(
-                "/api/matching/calculate-compatibility",
-                json={
-                    "userId1": "user-1",
-                    "userId2": "user-2",
-                },
-                headers={"X-API-Key": "invalid-key"},
-            )
+    @pytest.mark.asyncio(loop_scope="module")
+    async def test_calculate_compatibility_without_db(self, client, without_db):
+        """Test endpoint behavior without database connection."""
+        response = await client.post(
+            "/api/matching/calculate-compatibility",
+            json={
+                "userId1": "user-1",
+                "userId2": "user-2",
+            },
+            headers={"X-API-Key": TEST_API_KEY},
+        )
         
-        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
     
-    @pytest.mark.asyncio
-    async def test_calculate_compatibility_without_db(self):
-        """Test endpoint behavior without database connection."""
-        async with AsyncClient(app=app, base_url="http://test") as client:
-            response = await client.post(
-                "/api/matching/calculate-compatibility",
-                json={
-                    "userId1": "user-1",
-                    "userId2": "user-2",
-                },
-                headers={"X-API-Key": TEST_API_KEY},
-            )
+    @pytest.mark.asyncio(loop_scope="module")
+    async def test_calculate_compatibility_with_seeded_db(self, client, seeded_db):
+        """Test the specification response for two seeded profiles."""
+        response = await client.post(
+            "/api/matching/calculate-compatibility",
+            json={
+                "userId1": "user-1",
+                "userId2": "match-1",
+            },
+            headers={"X-API-Key": TEST_API_KEY},
+        )
         
-        # Should return 503 if DB not available, or process if DB is available
-        assert response.status_code in [
-            status.HTTP_503_SERVICE_UNAVAILABLE,
-            status.HTTP_404_NOT_FOUND,  # Users not found (expected with test DB)
-            status.HTTP_200_OK,
-        ]
+        assert response.status_code == status.HTTP_200_OK
+        data = CalculateCompatibilityResponseV1(**response.json())
+        expected = CompatibilityCalculator.calculate_compatibility_v1(
+            seeded_db["user-1"], seeded_db["match-1"]
+        )
+        assert data.score == expected["compatibilityScore"]
 
 
 class TestResponseFormats:
@@ -240,8 +340,6 @@ class TestResponseFormats:
     
     def test_score_breakdown_format(self):
         """Test that ScoreBreakdown matches specification."""
-        from models.schemas import ScoreBreakdown
-        
         breakdown = ScoreBreakdown(
             personality=85.0,
             interests=70.0,
@@ -254,8 +352,6 @@ class TestResponseFormats:
     
     def test_selection_profile_format(self):
         """Test that SelectionProfile matches specification."""
-        from models.schemas import SelectionProfile, ScoreBreakdown
-        
         profile = SelectionProfile(
             userId="user-123",
             compatibilityScore=82.5,
@@ -273,9 +369,6 @@ class TestResponseFormats:
     
     def test_generate_selection_response_format(self):
         """Test that GenerateSelectionResponse matches specification."""
-        from models.schemas import GenerateSelectionResponse, SelectionProfile, ScoreBreakdown
-        from datetime import datetime
-        
         response = GenerateSelectionResponse(
             selection=[
                 SelectionProfile(
@@ -297,8 +390,6 @@ class TestResponseFormats:
     
     def test_calculate_compatibility_response_format(self):
         """Test that CalculateCompatibilityResponseV1 matches specification."""
-        from models.schemas import CalculateCompatibilityResponseV1, ScoreBreakdown
-        
         response = CalculateCompatibilityResponseV1(
             score=78.5,
             breakdown=ScoreBreakdown(
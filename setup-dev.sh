@@ -64,7 +64,7 @@ echo "🐍 Activating virtual environment..."
 source venv/bin/activate
 
 echo "📦 Installing Python dependencies..."
-pip install -r requirements.txt
+pip install -r requirements-dev.txt
 
 if [ ! -f ".env" ]; then
     echo "📝 Creating environment file..."